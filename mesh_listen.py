@@ -1,12 +1,21 @@
 # mesh_listen.py
-import time, logging, queue, csv, os, json, threading
-from datetime import datetime
+import time, logging, csv, os, sys, json, threading, atexit, heapq, mmap, itertools, struct, gzip, hashlib, queue, io
 from http.server import BaseHTTPRequestHandler
 from http.server import ThreadingHTTPServer as HTTPServer
-from urllib.parse import urlparse, parse_qs
-from collections import deque, defaultdict
+from urllib.parse import parse_qs
+from collections import deque, defaultdict, OrderedDict
+from array import array
+from operator import itemgetter
 from pubsub import pub
 import meshtastic.tcp_interface  # type: ignore
+try:
+    import orjson  # optional: faster JSON encoding for the API, stdlib json otherwise
+except ImportError:
+    orjson = None
+try:
+    import msgpack  # optional: /api/messages answers Accept: application/msgpack with it
+except ImportError:
+    msgpack = None
 
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s: %(message)s")
@@ -52,10 +61,15 @@ LOG_PREFIX = os.getenv("LOG_PREFIX", "meshtastic_log")
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 API_HOST = os.getenv("API_HOST", "127.0.0.1")
 API_PORT = get_env_int("API_PORT", 8080)
+API_MAX_THREADS = max(1, get_env_int("API_MAX_THREADS", 32))
+TABLE_MAX_ROWS = get_env_int("TABLE_MAX_ROWS", 50)
 
 HISTORY_MAXLEN = get_env_int("HISTORY_MAXLEN", 300)
 HISTORY_SAMPLE_SECS = get_env_float("HISTORY_SAMPLE_SECS", 2.0)
 MAX_MSGS_PER_CONV = get_env_int("MAX_MSGS_PER_CONV", 2000)
+HISTORY_DIR = os.getenv("HISTORY_DIR", "").strip()   # empty: history is in-memory only
+if HISTORY_DIR: HISTORY_DIR = os.path.join(SCRIPT_DIR, HISTORY_DIR)
+HISTORY_FLUSH_SECS = 10.0
 
 # --- Runtime Settings (persistent) ---
 SETTINGS_FILE = os.path.join(SCRIPT_DIR, "settings.json")
@@ -73,11 +87,30 @@ DEFAULT_SETTINGS = {
     "conv_recent_hours": get_env_int("CONV_RECENT_HOURS", 48),
 }
 settings = DEFAULT_SETTINGS.copy()
+# Read-only copy for hot readers; swapped wholesale (atomic in CPython) on every apply.
+settings_cache: dict = dict(settings)
 
 # --- State ---
-outq: "queue.Queue[tuple[str, object]]" = queue.Queue()
-def say(msg: str): outq.put(("msg", msg))
-def emit_packet(packet: dict): outq.put(("packet", packet))
+# deque append/popleft are atomic in CPython, so producers never take a lock; the Events only wake consumers.
+# Console lines go to main(); packets go to one packet thread, so a slow terminal never holds up ingest
+# and handle_packet stays the single writer of nodes.
+outq: "deque[str]" = deque()
+_outq_wake = threading.Event()
+# append, then set only if unset: Event.set() takes the condition lock on every call, and a consumer
+# clears before it drains, so an append that sees the flag still set is picked up by that drain
+def say(msg: str):
+    outq.append(msg)
+    if not _outq_wake.is_set(): _outq_wake.set()
+OUTQ_MAX = 8192     # packets beyond this are dropped (and counted) rather than growing memory without bound
+OUTQ_BATCH = 1024   # console lines printed per wake-up, so the table/flush deadlines still run during a flood
+_pktq: "deque[dict]" = deque()
+_pkt_wake = threading.Event()
+_dropped_pkts = 0
+def emit_packet(packet: dict):
+    global _dropped_pkts
+    if len(_pktq) >= OUTQ_MAX: _dropped_pkts += 1; return
+    _pktq.append(packet)
+    if not _pkt_wake.is_set(): _pkt_wake.set()
 
 nodes_lock = threading.Lock()
 nodes: dict[str, dict] = {}
@@ -86,33 +119,85 @@ _connected = False
 node_names: dict[str, str] = {}
 g_iface = None
 my_id: str | None = None
-
-hist_lock = threading.Lock()
-history: dict[str, deque] = defaultdict(lambda: deque(maxlen=HISTORY_MAXLEN))
-last_hist_time: dict[str, float] = {}
-
-msg_lock = threading.Lock()
-messages: dict[str, deque] = defaultdict(lambda: deque(maxlen=MAX_MSGS_PER_CONV))
-last_msg_ts: dict[str, float] = {}
+# bumped whenever node_names/nodes may have gained an id; keys the seeded-conversation and label caches.
+# Both the pubsub and packet threads bump it, so new values come from _ver_seq (one atomic next()), not +=
+_known_ids_ver = 0
+# change stamps behind the API ETags, bumped *after* each mutation. Every bump stores a value
+# never used before, so a client's ETag can only match while nothing has changed since it read.
+_ver_seq = itertools.count(1)
+_data_ver = {"nodes": 0, "history": 0, "messages": 0}
+_ver_cond = threading.Condition()   # /api/stream handlers sleep on this until a stamp moves
+class _BumpHold(threading.local):
+    kinds: "set[str] | None" = None   # set by the packet thread while it holds its bumps for a batch
+_bump_hold = _BumpHold()
+def _bump(kind: str):
+    held = _bump_hold.kinds
+    if held is not None: held.add(kind); return
+    _data_ver[kind] = next(_ver_seq)
+    with _ver_cond: _ver_cond.notify_all()
+SSE_MIN_GAP = 1.0     # a packet burst becomes at most one stream event per kind per second
+SSE_KEEPALIVE = 15.0  # comment line sent on a quiet stream so proxies and the socket timeout don't drop it
+MSG_LONGPOLL_MAX = 25.0  # cap on /api/messages?wait=; stays under ApiHandler.timeout
+
+# History and messages are split across lock-striped shards (keyed by node / conversation id)
+# so a reader of one shard never waits on a writer to another.
+_SHARDS = 8
+def _shard_ix(key: str) -> int: return hash(key) & (_SHARDS - 1)
+
+# Per-node ring of history points packed row-major into one array('d'): HIST_FIELDS per row,
+# NaN for missing values. float64 rather than float32 so epoch seconds keep their precision.
+HIST_FIELDS = ("t","batt","temp","press","rh","rssi","snr")
+_HIST_W = len(HIST_FIELDS)
+_HIST_ROW = struct.Struct(f"{_HIST_W}d")   # native doubles, same layout as array('d') and the mmap body
+_NAN = float("nan")
+def _hist_ring_new(maxlen: int, nid: str | None = None) -> dict:
+    cap = max(1, maxlen)
+    path = _hist_path(nid)
+    if path:
+        try: return _hist_ring_map(path, cap)
+        except Exception as e: say(f"[History] mmap {path} failed: {e}")
+    return {"buf": array("d", [_NAN]) * (cap * _HIST_W), "cap": cap, "idx": 0, "n": 0}
+class _HistShard(dict):
+    def __missing__(self, nid):
+        ring = self[nid] = _hist_ring_new(HISTORY_MAXLEN, nid); return ring
+hist_locks = [threading.Lock() for _ in range(_SHARDS)]
+history_shards: list[dict[str, dict]] = [_HistShard() for _ in range(_SHARDS)]
+def _hist_shard(nid: str):
+    i = _shard_ix(nid); return hist_locks[i], history_shards[i]
+last_hist_time: dict[str, float] = {}   # monotonic; only ever compared against the sample interval
+
+msg_locks = [threading.Lock() for _ in range(_SHARDS)]
+# plain dicts: a conversation's deque is created by _store_msg, the only writer, so lookups never make one
+message_shards: list[dict[str, deque]] = [{} for _ in range(_SHARDS)]
+def _msg_shard(conv: str):
+    i = _shard_ix(conv); return msg_locks[i], message_shards[i]
+last_msg_ts: dict[str, float] = {}  # written under the conversation's shard lock; single-key reads need none
+last_bcast_ts: dict[str, float] = {}  # sender -> newest broadcast epoch, kept up to date by _append_msg
+last_msg_seq: dict[str, int] = {}  # conv -> _ver_seq value of its newest message; the stream names convs past a stamp
 
 seen_pkt_ids_lock = threading.Lock()
-seen_pkt_ids: deque[str] = deque(maxlen=10000)
-seen_pkt_set: set[str] = set()
+# two generations: ids are remembered for between SEEN_PKT_HALF and 2*SEEN_PKT_HALF packets
+SEEN_PKT_HALF = 5000
+_seen_cur: set = set()    # raw packet ids (ints from the radio); no str() copy per packet
+_seen_prev: set = set()
 
 recent_sends_lock = threading.Lock()
-recent_sends: deque[tuple[str,str,float]] = deque(maxlen=512)
+# (to, text) -> last send time (monotonic), oldest first. Writers hold the lock; _is_recent_send's single get needs none,
+# since a re-send updates the key in place (move_to_end) rather than popping and re-inserting it
+recent_sends_idx: "OrderedDict[tuple[str,str], float]" = OrderedDict()
+RECENT_SENDS_MAX = 512
 RECENT_SEND_SUPPRESS_SECS = 5.0
 
 # --- Settings helpers ---
 def _resize_history(new_max: int):
+    # no bulk rebuild under the shard locks: each ring is re-capped by _record_history on its next
+    # append, and readers clip to HISTORY_MAXLEN rows until then
     global HISTORY_MAXLEN
-    with hist_lock:
-        for nid, dq in list(history.items()):
-            history[nid] = deque(dq, maxlen=new_max)
     HISTORY_MAXLEN = new_max
+    _bump("history")
 
 def _apply_settings_locked():
-    global LOG_TO_CSV, SHOW_UNKNOWN, SHOW_PER_PACKET, HISTORY_SAMPLE_SECS
+    global LOG_TO_CSV, SHOW_UNKNOWN, SHOW_PER_PACKET, HISTORY_SAMPLE_SECS, settings_cache
     LOG_TO_CSV = bool(settings.get("log_to_csv", LOG_TO_CSV))
     SHOW_UNKNOWN = bool(settings.get("show_unknown", SHOW_UNKNOWN))
     SHOW_PER_PACKET = bool(settings.get("show_per_packet", SHOW_PER_PACKET))
@@ -120,125 +205,254 @@ def _apply_settings_locked():
     if new_ml != HISTORY_MAXLEN and new_ml > 0:
         _resize_history(new_ml)
     HISTORY_SAMPLE_SECS = as_float(settings.get("history_sample_secs", HISTORY_SAMPLE_SECS), HISTORY_SAMPLE_SECS)
+    settings_cache = dict(settings)
+    _invalidate_static_json()
 
 
 def _load_settings():
     try:
-        if os.path.exists(SETTINGS_FILE):
-            with open(SETTINGS_FILE, "r", encoding="utf-8") as f:
-                data = json.load(f)
+        # one stat covers both "missing" and "empty"; neither is worth opening
+        try: size = os.stat(SETTINGS_FILE).st_size
+        except FileNotFoundError: size = 0
+        if size > 0:
+            with open(SETTINGS_FILE, "rb") as f:
+                data = _json_loads(f.read())
+            if not isinstance(data, dict): raise ValueError("settings file is not a JSON object")
             with settings_lock:
-                for k in DEFAULT_SETTINGS.keys():
-                    if k in data:
-                        settings[k] = data[k]
+                # settings are flat scalars, so a single update over the known keys is the whole merge
+                settings.update((k, data[k]) for k in DEFAULT_SETTINGS.keys() & data.keys())
                 _apply_settings_locked()
     except Exception as e:
         say(f"[Settings] load failed: {e}")
 
+# saves are debounced: a burst of POSTs from the Settings UI coalesces into one disk write
+SETTINGS_SAVE_DELAY = 0.5
+_save_timer: threading.Timer | None = None
 def _save_settings():
-    try:
-        # caller already holds settings_lock
-        with open(SETTINGS_FILE, "w", encoding="utf-8") as f:
-            json.dump(settings, f, indent=2)
-    except Exception as e:
-        say(f"[Settings] save failed: {e}")
+    # caller already holds settings_lock
+    global _save_timer
+    if _save_timer is not None: _save_timer.cancel()
+    _save_timer = threading.Timer(SETTINGS_SAVE_DELAY, _flush_settings); _save_timer.daemon = True
+    _save_timer.start()
+
+# the bytes last written, so a save that changes nothing skips the disk; the write itself runs
+# outside settings_lock (under its own lock) so a slow disk never stalls settings readers. Each
+# snapshot is numbered under settings_lock, so a flush that reaches the disk after a newer one
+# (timer vs atexit) drops its stale payload instead of overwriting the newer file
+_settings_saved: bytes | None = None
+_settings_seq = 0         # last snapshot taken; written under settings_lock
+_settings_saved_seq = 0   # snapshot now on disk; written under _settings_io_lock
+_settings_io_lock = threading.Lock()
+def _flush_settings():
+    global _save_timer, _settings_saved, _settings_seq, _settings_saved_seq
+    with settings_lock:
+        if _save_timer is None: return
+        _save_timer.cancel(); _save_timer = None
+        payload = _json_pretty(settings)
+        _settings_seq += 1; seq = _settings_seq
+    with _settings_io_lock:
+        if seq < _settings_saved_seq: return
+        if payload == _settings_saved: _settings_saved_seq = seq; return
+        try:
+            tmp = SETTINGS_FILE + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(payload)
+            os.replace(tmp, SETTINGS_FILE)
+            _settings_saved, _settings_saved_seq = payload, seq
+        except Exception as e:
+            say(f"[Settings] save failed: {e}")
+atexit.register(_flush_settings)
 
 
 # --- mesh helpers ---
 def _refresh_names_from(iface):
-    global my_id
+    global my_id, _known_ids_ver
+    names_d, _intern, changed = node_names, sys.intern, False
     try:
         mi = getattr(iface, "myInfo", None)
         if isinstance(mi, dict):
             u = mi.get("user") or {}
-            if u.get("id"): my_id = u["id"]
+            if u.get("id"): my_id = _intern(u["id"])
             nm = (u.get("longName") or u.get("shortName"))
-            if my_id and nm: node_names[my_id] = nm
+            if my_id and nm and names_d.get(my_id) != nm:
+                names_d[my_id] = nm; changed = True
 
         nd = getattr(iface, "nodes", None) or {}
         for entry in nd.values():
-            u = (entry.get("user") or {})
+            u = entry.get("user")
+            if not u: continue
             fid = u.get("id")
             if not fid: continue
             name = u.get("longName") or u.get("shortName")
-            if name: node_names[fid] = name
-            if my_id is None and u.get("isLocal"): my_id = fid
+            if name and names_d.get(fid) != name:
+                names_d[_intern(fid)] = name; changed = True
+            if my_id is None and u.get("isLocal"): my_id = _intern(fid)
     except Exception:
         pass
-
-def _fmt(x, fmt="{:.2f}"):
-    try:
-        if x is None: return "-"
-        return fmt.format(float(x))
-    except Exception:
-        return str(x)
-def _fmt_latlon(x): return _fmt(x, "{:.5f}")
-def _fmt_alt(x):    return _fmt(x, "{:.0f}")
+    if changed: _known_ids_ver = next(_ver_seq); _invalidate_static_json()
+
+def _num(x, spec=".2f"):
+    if x is None: return "-"
+    return format(x, spec) if isinstance(x, (int, float)) else str(x)
+# (epoch second, iso, date) for the current second; swapped as one tuple so readers never see a torn update
+_ts_cache: tuple[int, str, str] = (0, "", "")
+def _now_strings(now: float) -> tuple[str, str]:
+    global _ts_cache
+    sec = int(now)
+    c = _ts_cache
+    if c[0] != sec:
+        iso = _iso_from_epoch(sec)
+        c = _ts_cache = (sec, iso, iso[:10])   # the date is the iso string's prefix
+    return c[1], c[2]
+# same text as datetime.fromtimestamp(ts).isoformat(timespec="seconds"), minus the datetime object
+def _iso_from_epoch(ts: float) -> str: return time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(ts))
+# per whole second: most nodes keep the same `updated` across many snapshots, so each is formatted once
+_iso_memo: dict[int, str] = {}
+def _iso_cached(ts: float) -> str:
+    sec = int(ts)
+    s = _iso_memo.get(sec)
+    if s is None:
+        if len(_iso_memo) >= 1024: _iso_memo.clear()
+        s = _iso_memo[sec] = _iso_from_epoch(sec)
+    return s
 def _fmt_time(ts: float | None):
     if not ts: return "-"
-    return datetime.fromtimestamp(ts).strftime("%H:%M:%S")
+    return time.strftime("%H:%M:%S", time.localtime(ts))
 def _pressure_to_hpa(p):
-    try: p = float(p)
-    except Exception: return None
+    if p is None: return None
+    if type(p) is not float:   # the decoder hands back floats; only other inputs pay for the conversion
+        try: p = float(p)
+        except Exception: return None
     return p / 100.0 if p > 1100 else p
 
-def _csv_path_for_now():
-    return os.path.join(SCRIPT_DIR, f"{LOG_PREFIX}_{time.strftime('%Y-%m-%d')}.csv")
-def _csv_ensure_header(path: str, fieldnames: list[str]):
-    if not os.path.exists(path) or os.path.getsize(path) == 0:
-        with open(path, "w", encoding="utf-8", newline="") as f:
-            csv.DictWriter(f, fieldnames=fieldnames).writeheader()
+CSV_FIELDS = ("ts_local","epoch","event","fromId","toId","portnum","rssi","snr",
+              "battery","voltage","temp_c","temp_f","humidity","pressure_hpa",
+              "lat","lon","alt","text")
+_CSV_ROW = dict.fromkeys(CSV_FIELDS)   # copied per packet; dict.copy clones the key table instead of re-hashing
+# rows go to a plain csv.writer in CSV_FIELDS order; DictWriter re-checks the keys of every row in Python
+_csv_cells = itemgetter(*CSV_FIELDS)
+CSV_FLUSH_SECS = 0.25   # a burst is collected this long before the writer thread writes and flushes it
+CSV_QUEUE_MAX = 10000
+
+csv_lock = threading.Lock()
+_csv_state = {"path": None, "fh": None, "writer": None, "reported": 0}
+_csv_dropped = 0   # only _csv_write adds to it; the writer reports the growth since "reported"
+# rows go from handle_packet onto _csv_q; a writer thread turns them into batched writerows + one flush
+_csv_q: deque = deque()
+_csv_wake = threading.Event()
+_csv_thread: threading.Thread | None = None
+
+def _csv_path_for_now(now: float | None = None):
+    return os.path.join(SCRIPT_DIR, f"{LOG_PREFIX}_{_now_strings(now or time.time())[1]}.csv")
+def _csv_close_locked():
+    fh = _csv_state["fh"]
+    if fh is not None:
+        try: fh.close()
+        except Exception: pass
+    _csv_state.update(path=None, fh=None, writer=None)
+def _csv_open_locked(path: str):
+    # long-lived append handle; rows are batched in the 64 KiB buffer. An append handle starts at
+    # the end of the file, so position 0 means a new (or empty) day file that still needs its header
+    _csv_close_locked()
+    fh = open(path, "a", encoding="utf-8", newline="", buffering=1 << 16)
+    w = csv.writer(fh)
+    if fh.tell() == 0: w.writerow(CSV_FIELDS)
+    _csv_state.update(path=path, fh=fh, writer=w)
 def _csv_write(row: dict):
+    global _csv_thread, _csv_dropped
     if not LOG_TO_CSV: return
-    try:
-        path = _csv_path_for_now()
-        fns = ["ts_local","epoch","event","fromId","toId","portnum","rssi","snr",
-               "battery","voltage","temp_c","temp_f","humidity","pressure_hpa",
-               "lat","lon","alt","text"]
-        _csv_ensure_header(path, fns)
-        with open(path, "a", encoding="utf-8", newline="") as f:
-            csv.DictWriter(f, fieldnames=fns).writerow(row)
-    except Exception as e:
-        say(f"[CSV] write failed: {e}")
-
+    if _csv_thread is None:
+        with csv_lock:
+            if _csv_thread is None:
+                _csv_thread = threading.Thread(target=_csv_writer_loop, name="csv-writer", daemon=True); _csv_thread.start()
+    if len(_csv_q) >= CSV_QUEUE_MAX: _csv_dropped += 1; return   # disk can't keep up; reported by the writer
+    _csv_q.append((time.time(), row))
+    # set only if unset: the writer clears before it drains, so a row that sees the flag set is in that drain
+    if not _csv_wake.is_set(): _csv_wake.set()
+def _csv_writer_loop():
+    while True:
+        _csv_wake.wait(); _csv_wake.clear()
+        time.sleep(CSV_FLUSH_SECS)
+        _csv_flush()
+def _csv_flush():
+    # drain everything queued, one writerows per day file, then a single flush
+    if not _csv_q: return
+    with csv_lock:
+        batch = []
+        while _csv_q: batch.append(_csv_q.popleft())
+        try:
+            first, last = _csv_path_for_now(batch[0][0]), _csv_path_for_now(batch[-1][0])
+            if first == last: groups = [(first, [r for _, r in batch])]
+            else: groups = [(p, [r for _, r in g]) for p, g in itertools.groupby(batch, key=lambda e: _csv_path_for_now(e[0]))]
+            for path, rows in groups:
+                if path != _csv_state["path"]: _csv_open_locked(path)
+                _csv_state["writer"].writerows(map(_csv_cells, rows))
+            _csv_state["fh"].flush()
+        except Exception as e:
+            _csv_close_locked()
+            say(f"[CSV] write failed: {e}")
+        dropped = _csv_dropped - _csv_state["reported"]; _csv_state["reported"] += dropped
+    if dropped: say(f"[CSV] writer fell behind; dropped {dropped} rows")
+def _csv_shutdown():
+    _csv_flush()
+    with csv_lock: _csv_close_locked()
+atexit.register(_csv_shutdown)
+
+_pair_cache: dict[tuple[str, str], str] = {}
+# inverse of _pair_cache; ids from elsewhere (URLs) are split once and remembered too
+_pair_parse: dict[str, tuple[str, str]] = {}
 def pair_conv_id(a: str, b: str) -> str:
     if not a or not b: return (a or b or "^all")
-    a2, b2 = (a, b) if a <= b else (b, a)
-    return f"pair:{a2}|{b2}"
+    key = (a, b) if a <= b else (b, a)
+    cid = _pair_cache.get(key)
+    if cid is None:
+        if len(_pair_cache) >= 4096: _pair_cache.clear(); _pair_parse.clear()
+        cid = _pair_cache[key] = sys.intern(f"pair:{key[0]}|{key[1]}")
+        _pair_parse[cid] = key
+    return cid
 
 def parse_pair_conv(cid: str):
+    pr = _pair_parse.get(cid)
+    if pr is not None: return pr
     if not cid.startswith("pair:"): return None
     try:
         body = cid.split(":",1)[1]
         a, b = body.split("|",1)
-        return a, b
     except Exception:
         return None
+    # a polling client repeats the same conv id every tick
+    if len(_pair_parse) >= 4096: _pair_cache.clear(); _pair_parse.clear()
+    pr = _pair_parse[cid] = (a, b)
+    return pr
 
 def disp_name(node_id: str | None) -> str:
     if not node_id: return "unknown"
     return node_names.get(node_id) or node_id
 
 def _record_recent_send(to_id: str, text: str, ts: float):
+    key, idx = (to_id, text), recent_sends_idx
     with recent_sends_lock:
-        recent_sends.append((to_id, text, ts))
+        idx[key] = ts; idx.move_to_end(key)   # keeps the order send order
+        # expired entries sit at the front; the size cap only bites on a flood of distinct sends
+        while True:
+            k = next(iter(idx))
+            if len(idx) <= RECENT_SENDS_MAX and ts - idx[k] <= RECENT_SEND_SUPPRESS_SECS: break
+            del idx[k]
 
-def _is_recent_send(from_id: str | None, to_id: str | None, text: str | None, now: float) -> bool:
+def _is_recent_send(from_id: str | None, to_id: str | None, text: str | None, mnow: float) -> bool:
     if not (from_id and to_id and text and my_id and from_id == my_id): return False
-    with recent_sends_lock:
-        for (tgt, txt, ts) in reversed(recent_sends):
-            if tgt == to_id and txt == text and (now - ts) <= RECENT_SEND_SUPPRESS_SECS:
-                return True
-    return False
+    ts = recent_sends_idx.get((to_id, text))
+    return ts is not None and (mnow - ts) <= RECENT_SEND_SUPPRESS_SECS
 
-def _pkt_seen_once(pkt_id: str | None) -> bool:
-    if not pkt_id: return False
+def _pkt_seen_once(pkt_id) -> bool:
+    global _seen_cur, _seen_prev
+    if pkt_id is None or pkt_id == "": return False
+    retired = None
     with seen_pkt_ids_lock:
-        if pkt_id in seen_pkt_set: return True
-        seen_pkt_set.add(pkt_id)
-        seen_pkt_ids.append(pkt_id)
-        if len(seen_pkt_ids) == seen_pkt_ids.maxlen:
-            seen_pkt_set.clear(); seen_pkt_set.update(seen_pkt_ids)
+        if pkt_id in _seen_cur or pkt_id in _seen_prev: return True
+        _seen_cur.add(pkt_id)
+        if len(_seen_cur) >= SEEN_PKT_HALF: retired, _seen_prev, _seen_cur = _seen_prev, _seen_cur, set()
+    del retired   # the oldest generation is freed here, after the lock is released
     return False
 
 # --- pubsub (bg thread) ---
@@ -246,7 +460,7 @@ def on_receive(packet, interface=None): emit_packet(packet)
 
 def on_connection(interface=None):
     global _connected, g_iface
-    _connected = True; g_iface = interface
+    _connected = True; g_iface = interface; _bump("nodes")
     _refresh_names_from(interface)
     say("[Connection] Established.")
     t0 = time.time()
@@ -255,286 +469,623 @@ def on_connection(interface=None):
 
 def on_connection_lost(interface=None):
     global _connected
-    _connected = False
+    _connected = False; _bump("nodes")
     say("[Connection] Lost.")
 
 def on_node_updated(node=None, interface=None, **_):
     if interface: _refresh_names_from(interface)
 
 # --- history helpers (store °F internally) ---
-def _record_history(node_id: str, rec: dict, now: float):
-    lt = last_hist_time.get(node_id, 0.0)
-    if now - lt < HISTORY_SAMPLE_SECS: return
-    last_hist_time[node_id] = now
-
-    tf = rec.get("temp_f")
-    if tf is None and rec.get("temp_c") is not None:
-        try: tf = float(rec["temp_c"]) * 9/5 + 32
-        except Exception: tf = None
-
-    pt = {
-        "t": now,
-        "batt": rec.get("batt"),
-        "temp": tf,        # Fahrenheit in history
-        "press": rec.get("press_hpa"),
-        "rh": rec.get("rh"),
-        "rssi": rec.get("rssi"),
-        "snr": rec.get("snr"),
-    }
-    with hist_lock:
-        history[node_id].append(pt)
+def _hist_num(v) -> float:
+    if v is None: return _NAN
+    try: return float(v)
+    except Exception: return _NAN
+
+def _hist_ring_push(ring: dict, row):
+    _HIST_ROW.pack_into(ring["buf"], ring["idx"] * _HIST_ROW.size, *row)   # in place: no temporary array
+    ring["idx"] = (ring["idx"] + 1) % ring["cap"]
+    if ring["n"] < ring["cap"]: ring["n"] += 1
+    hdr = ring.get("hdr")
+    if hdr is not None: hdr[1] = ring["idx"]; hdr[2] = ring["n"]
+
+def _hist_ring_copy(ring: dict, limit: int | None = None, since: float | None = None) -> array:
+    """Newest `limit` rows (all if None, only those stamped after `since` if given), oldest first,
+    as one flat float array (at most two memcpys)."""
+    cap, n, buf = ring["cap"], ring["n"], ring["buf"]
+    k = min(n, limit) if limit else n
+    if since is not None:   # rows are in time order: count back from the newest until one is old enough
+        last = ring["idx"] - 1
+        for j in range(k):
+            if buf[((last - j) % cap) * _HIST_W] <= since: k = j; break
+    start = (ring["idx"] - k) % cap
+    end = start + k
+    parts = (buf[start * _HIST_W:end * _HIST_W],) if end <= cap else (buf[start * _HIST_W:], buf[:(end - cap) * _HIST_W])
+    out = array("d")
+    for part in parts:   # array slices are already copies; mmap views are copied out byte-wise
+        if isinstance(part, memoryview): out.frombytes(part.cast("B"))
+        else: out += part
+    return out
+
+def _hist_rows(flat: array) -> list[tuple]:
+    return list(zip(*(flat[i::_HIST_W] for i in range(_HIST_W))))
+
+def _hist_ring_rows(ring: dict, limit: int | None = None):
+    """Newest `limit` rows (all if None), oldest first, as tuples of floats."""
+    return _hist_rows(_hist_ring_copy(ring, limit))
+
+# With HISTORY_DIR set, each node's ring is an mmap'd file written in place: a [cap, idx, n] int64
+# header then the cap*HIST_FIELDS float64 body. The OS writes dirty pages back; _history_flush forces it.
+_HIST_HDR = 3 * 8
+def _hist_path(nid) -> str | None:
+    if not HISTORY_DIR or not isinstance(nid, str) or not nid: return None
+    return os.path.join(HISTORY_DIR, "".join(c if c.isalnum() or c in "!-_" else "_" for c in nid) + ".hist")
+
+def _hist_ring_attach(path: str, init_cap: int = 0) -> dict | None:
+    with open(path, "r+b") as f:
+        try: mm = mmap.mmap(f.fileno(), 0)
+        except ValueError: return None   # empty file
+    hdr = memoryview(mm)[:_HIST_HDR].cast("q")
+    if init_cap: hdr[0] = init_cap; hdr[1] = 0; hdr[2] = 0
+    cap, idx, n = hdr[0], hdr[1], hdr[2]
+    if cap <= 0 or len(mm) != _HIST_HDR + cap * _HIST_W * 8 or not (0 <= idx < cap and 0 <= n <= cap):
+        hdr.release(); mm.close(); return None
+    return {"buf": memoryview(mm)[_HIST_HDR:].cast("d"), "cap": cap, "idx": idx, "n": n, "hdr": hdr, "mm": mm}
+
+def _hist_ring_map(path: str, cap: int) -> dict:
+    carry = []
+    if os.path.exists(path):
+        old = _hist_ring_attach(path)
+        if old is not None and old["cap"] == cap: return old
+        if old is not None: carry = _hist_ring_rows(old, cap); _hist_ring_close(old)
+    with open(path, "wb") as f: f.truncate(_HIST_HDR + cap * _HIST_W * 8)
+    ring = _hist_ring_attach(path, init_cap=cap)
+    for row in carry: _hist_ring_push(ring, row)
+    return ring
+
+def _hist_ring_recap(ring: dict, nid: str, cap: int) -> dict:
+    # caller holds the shard lock
+    if "mm" in ring:   # the file is re-mapped at the new size and carries its own rows over
+        _hist_ring_close(ring); return _hist_ring_new(cap, nid)
+    new = _hist_ring_new(cap)
+    for row in _hist_ring_rows(ring, cap): _hist_ring_push(new, row)
+    return new
+
+def _hist_ring_close(ring: dict):
+    mm = ring.get("mm")
+    if mm is None: return
+    ring["buf"].release(); ring["hdr"].release()
+    try: mm.flush()
+    except Exception: pass
+    mm.close()
+
+def _history_load():
+    # map the rings left by a previous run so charts come back with history
+    if not HISTORY_DIR: return
+    try:
+        os.makedirs(HISTORY_DIR, exist_ok=True); names = os.listdir(HISTORY_DIR)
+    except Exception as e:
+        say(f"[History] {HISTORY_DIR} unavailable: {e}"); return
+    for fn in names:
+        if not fn.endswith(".hist"): continue
+        nid = fn[:-5]; lock, shard = _hist_shard(nid)
+        with lock: shard[nid]
+    _bump("history")
+
+def _history_flush(close: bool = False):
+    global HISTORY_DIR
+    if close: HISTORY_DIR = ""   # late writers at shutdown get plain in-memory rings
+    for lock, shard in zip(hist_locks, history_shards):
+        with lock:
+            for nid, ring in list(shard.items()):
+                mm = ring.get("mm")
+                if mm is None: continue
+                if close: _hist_ring_close(ring); del shard[nid]; continue
+                try: mm.flush()
+                except Exception as e: say(f"[History] flush failed: {e}")
+atexit.register(_history_flush, True)
+
+def _record_history(node_id: str, rec: dict, now: float, mnow: float):
+    # most calls land inside the sample interval: bail before any conversion or allocation
+    lt = last_hist_time.get(node_id)
+    if lt is not None and mnow - lt < HISTORY_SAMPLE_SECS: return
+
+    g = rec.get
+    # the telemetry handler always sets temp_f alongside temp_c, so there is nothing to convert here
+    row = (now, _hist_num(g("batt")),
+           _hist_num(g("temp_f")),        # Fahrenheit in history
+           _hist_num(g("press_hpa")), _hist_num(g("rh")),
+           _hist_num(g("rssi")), _hist_num(g("snr")))
+    last_hist_time[node_id] = mnow   # advance the deadline before contending for the shard lock
+    lock, shard = _hist_shard(node_id)
+    with lock:
+        ring, cap = shard[node_id], HISTORY_MAXLEN
+        if ring["cap"] != cap: ring = shard[node_id] = _hist_ring_recap(ring, node_id, cap)
+        _hist_ring_push(ring, row)
+    _bump("history")
 
 # --- chat helpers ---
+def _store_msg(shard: dict, conv: str, msg: dict):
+    # caller holds the conversation's shard lock
+    dq = shard.get(conv)
+    if dq is None: dq = shard[conv] = deque(maxlen=MAX_MSGS_PER_CONV)
+    ts = msg.get("epoch", time.time())
+    if dq and ts < dq[-1].get("epoch", 0):
+        # stamped before a message another thread stored first: slot it in by time, since _conv_tail
+        # stops at the first message at or below `since`
+        i = len(dq) - 1
+        while i > 0 and dq[i - 1].get("epoch", 0) > ts: i -= 1
+        if len(dq) == dq.maxlen:
+            if i == 0: return   # older than everything kept; appending would have evicted it anyway
+            dq.popleft(); i -= 1
+        dq.insert(i, msg)
+    else:
+        dq.append(msg)
+    if ts > last_msg_ts.get(conv, 0.0): last_msg_ts[conv] = ts   # only ever moves forward
+    last_msg_seq[conv] = next(_ver_seq)   # drawn before the "messages" bump, so always below the stamp it causes
+    if conv == "^all":
+        f = msg.get("fromId")
+        if ts > last_bcast_ts.get(f, 0.0): last_bcast_ts[f] = ts
+
 def _append_msg(conv: str, msg: dict):
-    with msg_lock:
-        messages[conv].append(msg)
-        last_msg_ts[conv] = msg.get("epoch", time.time())
+    lock, shard = _msg_shard(conv)
+    with lock: _store_msg(shard, conv, msg)
+    _bump("messages")
+
+def _append_msgs(items: list):
+    # one lock acquisition per shard and a single stamp bump for the whole batch; order within a conv is kept
+    by_shard = defaultdict(list)
+    for conv, msg in items: by_shard[_shard_ix(conv)].append((conv, msg))
+    for i, group in by_shard.items():
+        shard = message_shards[i]
+        with msg_locks[i]:
+            for conv, msg in group: _store_msg(shard, conv, msg)
+    _bump("messages")
+
+# /api/send hands its own messages to one writer thread, so the request only waits on sendText
+_sentq: "deque[tuple[str, dict]]" = deque()
+_sent_wake = threading.Event()
+def _queue_sent_msg(conv: str, msg: dict): _sentq.append((conv, msg)); _sent_wake.set()
+def _sent_writer():
+    while True:
+        _sent_wake.wait(); _sent_wake.clear()
+        batch = []
+        while _sentq: batch.append(_sentq.popleft())
+        if batch:
+            # stamped as they are stored, not before the blocking sendText: replies that arrived during
+            # the send are already in the deque, and a poller that has seen them must still get these
+            now = time.time(); iso = _now_strings(now)[0]
+            for _conv, m in batch: m["epoch"], m["iso"] = now, iso
+            try: _append_msgs(batch)
+            except Exception as e: say(f"[Send] storing sent messages failed: {e}")
+
+def _conv_tail(conv: str, since: float | None = None, limit: int | None = None, keep=None) -> list:
+    """Messages newer than `since` (at most the newest `limit`, optionally filtered), oldest first.
+    Deques are in time order, so walk back from the right end and stop early: an incremental
+    poll touches only the new messages instead of copying the whole conversation."""
+    # last_msg_ts is the newest epoch per conversation: an up-to-date poller is answered without the lock
+    if since is not None and last_msg_ts.get(conv, 0.0) <= since: return []
+    lock, shard = _msg_shard(conv)
+    out = []
+    with lock:
+        dq = shard.get(conv)
+        if dq:
+            for m in reversed(dq):
+                if since is not None and m.get("epoch", 0) <= since: break
+                if keep is not None and not keep(m): continue
+                out.append(m)
+                if limit is not None and len(out) >= limit: break
+    out.reverse()
+    return out
+
+def _conv_ids() -> set:
+    out = set()
+    for lock, shard in zip(msg_locks, message_shards):
+        with lock: out.update(shard.keys())
+    return out
 
 # --- packet processing ---
+_EMPTY_D: dict = {}  # shared read-only fallback for missing sub-dicts; never mutated
+_ABSENT = object()   # .get() default that tells a missing key from one holding None
+# Port handlers apply a decoded payload to a private copy of the node record
+# and return the extra CSV columns for that packet.
+def _update_text(rec: dict, d: dict, now: float) -> dict:
+    txt = d.get("text") or ""
+    rec["text"] = txt[:120]; rec["updated"] = now
+    return {"text": txt}
+
+def _update_position(rec: dict, d: dict, now: float) -> dict:
+    p = d.get("position") or _EMPTY_D
+    # each field is looked up once and reused for both the record and the CSV columns
+    lat = rec["lat"] = p.get("latitude")
+    lon = rec["lon"] = p.get("longitude")
+    alt = rec["alt"] = p.get("altitude")
+    rec["updated"] = now
+    return {"lat": lat,"lon": lon,"alt": alt}
+
+def _update_telemetry(rec: dict, d: dict, now: float) -> dict:
+    t  = d.get("telemetry") or _EMPTY_D; dm = t.get("deviceMetrics") or _EMPTY_D; em = t.get("environmentMetrics") or _EMPTY_D
+    # one probe per key; a present-but-null value still overwrites, as with the old `in` check
+    b = dm.get("batteryLevel", _ABSENT)
+    if b is not _ABSENT: rec["batt"] = b
+    v = dm.get("voltage", _ABSENT)
+    if v is not _ABSENT: rec["voltage"] = v
+    if em:
+        c  = em.get("temperature"); rh = em.get("relativeHumidity"); pa = _pressure_to_hpa(em.get("barometricPressure"))
+        if c is not None:
+            if type(c) is not float:
+                try: c = float(c)
+                except Exception: c = None
+            if c is not None:
+                rec["temp_c"] = c
+                rec["temp_f"] = c*9/5+32
+        if rh is not None: rec["rh"] = rh
+        if pa is not None: rec["press_hpa"] = pa
+    rec["updated"] = now
+    return {"battery": rec.get("batt"),"voltage": rec.get("voltage"),
+            "temp_c": rec.get("temp_c"),"temp_f": rec.get("temp_f"),
+            "humidity": rec.get("rh"),"pressure_hpa": rec.get("press_hpa")}
+
+# interned so the dispatch lookup and port == "..." checks hit the identity fast path
+PORTS = {p: sys.intern(p) for p in ("TEXT_MESSAGE_APP","POSITION_APP","TELEMETRY_APP")}
+
+_PORT_HANDLERS = {
+    PORTS["TEXT_MESSAGE_APP"]: _update_text,
+    PORTS["POSITION_APP"]: _update_position,
+    PORTS["TELEMETRY_APP"]: _update_telemetry,
+}
+
+# a first-seen node starts as a copy of this (same trick as _CSV_ROW), not a 15-key literal
+_NODE_BLANK = dict.fromkeys(("to","rssi","snr","batt","voltage","temp_c","temp_f","rh","press_hpa",
+                             "lat","lon","alt","text","name","updated"))
+
 def handle_packet(pkt: dict):
-    d = (pkt.get("decoded") or {})
+    d = pkt.get("decoded") or _EMPTY_D
     port = d.get("portnum")
+    if isinstance(port, str): port = sys.intern(port)
     frm, to = pkt.get("fromId"), pkt.get("toId")
     rssi, snr = pkt.get("rxRssi"), pkt.get("rxSnr")
-    now = time.time()
+    # wall clock for what clients and the CSV see, monotonic for the suppress/sample windows
+    now, mnow = time.time(), time.monotonic()
 
-    global my_id
+    global my_id, _known_ids_ver
     if my_id is None and port == "TEXT_MESSAGE_APP" and to and to != "^all":
         my_id = to
 
     pkt_id = pkt.get("id") or d.get("id")
-    if _pkt_seen_once(str(pkt_id) if pkt_id is not None else None):
+    if _pkt_seen_once(pkt_id):
         return
 
+    # copy-on-write: only this thread writes nodes, so update a private copy and publish it
+    # with one store; readers never see a half-applied packet and the lock is held for a single assignment
     friendly = node_names.get(frm)
-    with nodes_lock:
-        if frm not in nodes:
-            nodes[frm] = {
-                "to":None,"rssi":None,"snr":None,"batt":None,"voltage":None,
-                "temp_c":None,"temp_f":None,"rh":None,"press_hpa":None,
-                "lat":None,"lon":None,"alt":None,"text":None,
-                "name": friendly, "updated":None
-            }
-        rec = nodes[frm]
-        rec["to"] = to
-        if rssi is not None: rec["rssi"] = rssi
-        if snr  is not None: rec["snr"]  = snr
-        if friendly and not rec.get("name"): rec["name"] = friendly
-
-    if settings.get("show_per_packet", True):
+    old = nodes.get(frm)
+    if old is None:
+        _known_ids_ver = next(_ver_seq)
+        rec = _NODE_BLANK.copy(); rec["name"] = friendly
+    else: rec = old.copy()
+    rec["to"] = to
+    if rssi is not None: rec["rssi"] = rssi
+    if snr  is not None: rec["snr"]  = snr
+    if friendly and not rec.get("name"): rec["name"] = friendly
+    h = _PORT_HANDLERS.get(port)
+    extra = h(rec, d, now) if h else None
+    with nodes_lock: nodes[frm] = rec
+    _bump("nodes")
+
+    # module flags are refreshed with settings_cache by _apply_settings_locked; no dict lookups per packet
+    if SHOW_PER_PACKET:
         if port == "TEXT_MESSAGE_APP":
             say(f"[TEXT] {frm} → {to} | rssi={rssi} snr={snr} | {d.get('text')}")
-        elif port == "POSITION_APP":
-            p = d.get("position") or {}
-            say(f"[GPS]  {frm} → {to} | rssi={rssi} snr={snr} | lat={p.get('latitude')} lon={p.get('longitude')} alt={p.get('altitude')}")
-        elif port not in ("TELEMETRY_APP",) and settings.get("show_unknown", True):
+        elif port == "POSITION_APP":  # _update_position already copied the fix into rec
+            say(f"[GPS]  {frm} → {to} | rssi={rssi} snr={snr} | lat={rec['lat']} lon={rec['lon']} alt={rec['alt']}")
+        elif port != "TELEMETRY_APP" and SHOW_UNKNOWN:
             say(f"[UNK]  {frm} → {to} | rssi={rssi} snr={snr} | port={port}")
 
-    base = {"ts_local": datetime.now().isoformat(timespec="seconds"),
-            "epoch": f"{now:.0f}","event": port or "UNKNOWN",
-            "fromId": frm,"toId": to,"portnum": port,
-            "rssi": rssi,"snr": snr,
-            "battery": None,"voltage": None,"temp_c": None,"temp_f": None,
-            "humidity": None,"pressure_hpa": None,"lat": None,"lon": None,"alt": None,"text": None}
-
-    changed = False
     if port == "TEXT_MESSAGE_APP":
-        txt = d.get("text") or ""
+        txt = extra["text"]
         scope = "broadcast" if (to == "^all") else "dm"
-        if not _is_recent_send(frm, to, txt, now):
+        if not _is_recent_send(frm, to, txt, mnow):
             conv = "^all" if scope=="broadcast" else pair_conv_id(frm or "", to or "")
-            msg = {"epoch": now,"iso": datetime.now().isoformat(timespec="seconds"),
+            msg = {"epoch": now,"iso": _now_strings(now)[0],
                    "fromId": frm,"toId": to,"text": txt,"rssi": rssi,"snr": snr,"scope": scope}
             _append_msg(conv, msg)
-        with nodes_lock:
-            nodes[frm]["text"] = txt[:120]; nodes[frm]["updated"] = now
-            rec = nodes[frm]
-        _csv_write(base | {"text": txt}); changed = True
-
-    elif port == "POSITION_APP":
-        p = d.get("position") or {}
-        with nodes_lock:
-            nodes[frm]["lat"] = p.get("latitude")
-            nodes[frm]["lon"] = p.get("longitude")
-            nodes[frm]["alt"] = p.get("altitude")
-            nodes[frm]["updated"] = now
-            rec = nodes[frm]
-        _csv_write(base | {"lat": rec["lat"],"lon": rec["lon"],"alt": rec["alt"]}); changed = True
-
-    elif port == "TELEMETRY_APP":
-        t  = d.get("telemetry") or {}; dm = t.get("deviceMetrics") or {}; em = t.get("environmentMetrics") or {}
-        with nodes_lock:
-            if "batteryLevel" in dm: nodes[frm]["batt"] = dm.get("batteryLevel")
-            if "voltage"      in dm: nodes[frm]["voltage"] = dm.get("voltage")
-            if em:
-                c  = em.get("temperature"); rh = em.get("relativeHumidity"); pa = _pressure_to_hpa(em.get("barometricPressure"))
-                if c is not None:
-                    try:
-                        c = float(c)
-                        nodes[frm]["temp_c"] = c
-                        nodes[frm]["temp_f"] = c*9/5+32
-                    except Exception: pass
-                if rh is not None: nodes[frm]["rh"] = rh
-                if pa is not None: nodes[frm]["press_hpa"] = pa
-            nodes[frm]["updated"] = now
-            rec = nodes[frm]
-        _csv_write(base | {"battery": rec.get("batt"),"voltage": rec.get("voltage"),
-                           "temp_c": rec.get("temp_c"),"temp_f": rec.get("temp_f"),
-                           "humidity": rec.get("rh"),"pressure_hpa": rec.get("press_hpa")})
-        changed = True
-    else:
-        if settings.get("show_unknown", True): _csv_write(base)
 
-    if changed:
-        _record_history(frm, rec, now)
+    if extra is None and not SHOW_UNKNOWN:
+        return
+
+    row = _CSV_ROW.copy()
+    row["ts_local"] = _now_strings(now)[0]
+    row["epoch"] = f"{now:.0f}"; row["event"] = port or "UNKNOWN"
+    row["fromId"] = frm; row["toId"] = to; row["portnum"] = port
+    row["rssi"] = rssi; row["snr"] = snr
+    if extra is not None: row.update(extra)
+    _csv_write(row)
+
+    if extra is not None:
+        _record_history(frm, rec, now, mnow)
+
+PKT_BUMP_BATCH = 256   # packets handled per stamp bump; bounds how stale a stamp gets during a flood
+def _packet_worker():
+    # a batch of packets bumps each stamp it touched once, after the batch, instead of taking
+    # _ver_cond once or more per packet; stamps still only ever move after the data they cover
+    hold = _bump_hold
+    while True:
+        _pkt_wake.wait(); _pkt_wake.clear()
+        while _pktq:
+            hold.kinds = kinds = set()
+            try:
+                for _ in range(min(len(_pktq), PKT_BUMP_BATCH)):
+                    try: handle_packet(_pktq.popleft())
+                    except Exception as e: say(f"[Packet] handling failed: {e}")
+            finally:
+                hold.kinds = None
+                for k in kinds: _bump(k)
 
 # --- console table (°F shown) ---
+# node, batt, V, °F, hPa, RH, RSSI, SNR, lat, lon, alt, text, updated
+_ROW_FMT = "{:<16} | {} | {} | {} | {} | {} | {} | {} | {} | {} | {} | {:<24} | {}"
+_TABLE_HDR = ("Node".ljust(16)+" | Batt% | V | T(°F) | P(hPa) | RH% | RSSI | SNR | Lat | Lon | Alt | " +
+              "Last Text".ljust(24)+" | Updated\n" + "-"*119)
+# nid -> (record, its formatted line) for the rows shown last time. Published records are never
+# mutated, so an identical record object means an identical line and the row isn't formatted again
+_table_rows: dict[str, tuple[dict, str]] = {}
 def render_table():
+    global _table_rows
     with nodes_lock:
-        snap = list(sorted(nodes.items(), key=lambda kv: kv[1].get("updated") or 0, reverse=True))
-    rows = []
-    rows.append(("Node".ljust(16)+" | Batt% | V | T(°F) | P(hPa) | RH% | RSSI | SNR | Lat | Lon | Alt | " +
-                 "Last Text".ljust(24)+" | Updated"))
-    rows.append("-"*119)
+        total = len(nodes)
+        snap = heapq.nlargest(TABLE_MAX_ROWS, nodes.items(), key=lambda kv: kv[1].get("updated") or 0)
+    rows = [_TABLE_HDR]
+    fmt, num, prev, shown = _ROW_FMT.format, _num, _table_rows, {}
     for nid, rec in snap:
-        display = (rec.get("name") or nid)
-        rows.append(" | ".join([
-            str(display).ljust(16),
-            _fmt(rec.get("batt"), "{:.0f}"), _fmt(rec.get("voltage")),
-            _fmt(rec.get("temp_f")), _fmt(rec.get("press_hpa")),
-            _fmt(rec.get("rh"), "{:.1f}"), _fmt(rec.get("rssi"), "{:.0f}"), _fmt(rec.get("snr")),
-            _fmt_latlon(rec.get("lat")), _fmt_latlon(rec.get("lon")), _fmt_alt(rec.get("alt")),
-            (rec.get("text") or "-")[:24].ljust(24), _fmt_time(rec.get("updated"))
-        ]))
+        c = prev.get(nid)
+        if c is not None and c[0] is rec: line = c[1]
+        else:
+            g = rec.get
+            # positional fields: no per-row kwargs dict
+            line = fmt(str(g("name") or nid),
+                       num(g("batt"), ".0f"), num(g("voltage")), num(g("temp_f")), num(g("press_hpa")),
+                       num(g("rh"), ".1f"), num(g("rssi"), ".0f"), num(g("snr")),
+                       num(g("lat"), ".5f"), num(g("lon"), ".5f"), num(g("alt"), ".0f"),
+                       (g("text") or "-")[:24], _fmt_time(g("updated")))
+        shown[nid] = (rec, line)
+        rows.append(line)
+    _table_rows = shown   # only the rows on screen are kept
+    if total > len(snap): rows.append(f"... {total - len(snap)} more")
     return "\n".join(rows)
 
+# --- JSON encoding ---
+# _json_pretty is the indented form for the settings file, which people read and edit by hand
+if orjson is not None:
+    def _json_bytes(obj) -> bytes: return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    def _json_pretty(obj) -> bytes: return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+else:
+    # same compact, raw-UTF-8 output as orjson; one encoder instance instead of json.dumps rebuilding it per call
+    _json_enc = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+    def _json_bytes(obj) -> bytes: return _json_enc(obj).encode("utf-8")
+    def _json_pretty(obj) -> bytes: return json.dumps(obj, indent=2).encode("utf-8")
+_json_loads = orjson.loads if orjson is not None else json.loads   # both take raw UTF-8 bytes
+
+# names + settings change rarely; keep them pre-encoded (without braces) and splice into /api/nodes.
+# Clients echo names_ver back as ?nv=; while it is current the names map is left out of the response.
+# Seeded from the clock so a restarted server never reuses a version a client already holds.
+_static_json_ver = int(time.time())
+_static_json: tuple[int, bytes, bytes] = (-1, b"", b"")   # (version, with names, without names)
+def _invalidate_static_json():
+    global _static_json_ver
+    _static_json_ver += 1
+    _bump("nodes")
+def _static_json_bytes(nv: int | None = None) -> bytes:
+    global _static_json
+    ver = _static_json_ver
+    if _static_json[0] != ver:
+        _static_json = (ver,
+                        _json_bytes({"names_ver": ver, "names": dict(node_names), "settings": settings_cache})[1:-1],
+                        _json_bytes({"names_ver": ver, "settings": settings_cache})[1:-1])
+    c = _static_json
+    return c[2] if nv == c[0] else c[1]
+
+# misses build under a lock per cache key: when a change lands, every tab polling that endpoint misses at
+# once and the first one builds for all of them, while other endpoints (and gzip.compress, which releases
+# the GIL) carry on in parallel
+_key_locks_guard = threading.Lock()
+def _key_lock(locks: dict[str, threading.Lock], key: str) -> threading.Lock:
+    lk = locks.get(key)
+    if lk is None:
+        with _key_locks_guard:
+            if len(locks) > 256: locks.clear()   # same bound idea as the caches; a cleared lock only costs a duplicate build
+            lk = locks.setdefault(key, threading.Lock())
+    return lk
+
+# encoded responses keyed by endpoint; an entry is reused while its ETag (i.e. the data versions) is unchanged
+_json_cache: dict[str, tuple[str, bytes]] = {}
+_json_build_locks: dict[str, threading.Lock] = {}
+def _cached_json(key: str, etag: str, build) -> bytes:
+    c = _json_cache.get(key)
+    if c is not None and c[0] == etag: return c[1]
+    with _key_lock(_json_build_locks, key):
+        c = _json_cache.get(key)
+        if c is not None and c[0] == etag: return c[1]
+        buf = build()
+        if len(_json_cache) > 64: _json_cache.clear()   # odd ?n= values shouldn't pile up
+        _json_cache[key] = (etag, buf)
+    return buf
+
+# gzip of a _json_cache body, made on first demand and kept under the same key and ETag
+COALESCE_MAX = 64 * 1024   # bodies up to this size are joined onto the header block and sent with it
+GZIP_MIN_BYTES = 1024   # smaller bodies aren't worth the compression pass (they barely shrink)
+def _gzip(body: bytes) -> bytes: return gzip.compress(body, 1, mtime=0)   # level 1: polls favour speed over ratio
+_gzip_cache: dict[str, tuple[str, bytes]] = {}
+_gzip_build_locks: dict[str, threading.Lock] = {}
+def _cached_gzip(key: str, etag: str, body: bytes) -> bytes:
+    c = _gzip_cache.get(key)
+    if c is not None and c[0] == etag: return c[1]
+    with _key_lock(_gzip_build_locks, key):   # same one-builder-per-key rule as _cached_json
+        c = _gzip_cache.get(key)
+        if c is not None and c[0] == etag: return c[1]
+        gz = _gzip(body)
+        if len(_gzip_cache) > 64: _gzip_cache.clear()
+        _gzip_cache[key] = (etag, gz)
+    return gz
+
 # --- JSON snapshots ---
-def _nodes_json_snapshot():
-    with nodes_lock, settings_lock:
-        now_iso = datetime.now().isoformat(timespec="seconds")
-        out = {"connected": _connected, "server_time": now_iso, "nodes": {}, "my_id": my_id,
-               "my_name": (node_names.get(my_id) if my_id else None), "names": node_names,
-               "settings": {k: settings[k] for k in settings}}  # include settings for client
-        for k,v in nodes.items():
-            out["nodes"][k] = {
-                **v,
-                "name": v.get("name"),
-                "updated_iso": datetime.fromtimestamp(v["updated"]).isoformat(timespec="seconds") if v.get("updated") else None,
-                "updated_epoch": v.get("updated"),
-            }
-        return out
+def _nodes_json_dynamic():
+    # published records are never mutated, so the lock only covers copying the references
+    with nodes_lock:
+        snap = list(nodes.items())
+        connected, me = _connected, my_id
+    out = {"connected": connected, "server_time": _now_strings(time.time())[0], "nodes": {}, "my_id": me,
+           "my_name": (node_names.get(me) if me else None)}
+    dst = out["nodes"]
+    for k, v in snap: dst[k] = _node_json(v)
+    return out
 
-def _history_json_snapshot(limit_per_node: int | None):
-    with hist_lock:
-        result = {}
-        for nid, dq in history.items():
-            pts = list(dq)[-limit_per_node:] if limit_per_node else list(dq)
-            result[nid] = [{"t": round(p["t"],2),
-                            "batt": p["batt"], "temp": p["temp"], "press": p["press"],
-                            "rh": p["rh"], "rssi": p["rssi"], "snr": p["snr"]} for p in pts]
-        return result
+def _node_json(v: dict) -> dict:
+    # one copy per record, with the wire-only fields added in place
+    upd = v.get("updated")
+    v = v.copy()
+    v["updated_iso"] = _iso_cached(upd) if upd else None
+    v["updated_epoch"] = upd
+    return v
+
+def _nodes_json_bytes(nv: int | None = None) -> bytes:
+    return _json_bytes(_nodes_json_dynamic())[:-1] + b"," + _static_json_bytes(nv) + b"}"
+
+def _dashboard_json_bytes(limit_per_node: int | None, nv: int | None = None, hsince: float | None = None,
+                          nodes_body: bytes | None = None) -> bytes:
+    # /api/nodes with the (columnar) history spliced in: one response per dashboard tick. nodes_body is an
+    # already encoded /api/nodes body (see _get_dashboard), so a delta poll only encodes the new rows
+    if nodes_body is None: nodes_body = _nodes_json_bytes(nv)
+    return (nodes_body[:-1] + b',"history":' + _json_bytes(_history_cols_snapshot(limit_per_node, hsince)) + b"}")
+
+def _hist_flats(limit_per_node: int | None, since: float | None = None) -> dict[str, array]:
+    # the shard lock only covers a raw buffer copy; splitting and formatting run unlocked
+    flats = {}
+    # rings not yet re-capped after a shrink may hold more than HISTORY_MAXLEN rows
+    lim = HISTORY_MAXLEN if limit_per_node is None else min(limit_per_node, HISTORY_MAXLEN)
+    for lock, shard in zip(hist_locks, history_shards):
+        with lock:
+            for nid, ring in shard.items(): flats[nid] = _hist_ring_copy(ring, lim, since)
+    return flats
+
+def _history_cols_snapshot(limit_per_node: int | None, since: float | None = None):
+    """{nid: {field: [values]}}: one array per HIST_FIELDS column, so keys aren't repeated per point.
+    With `since`, only rows stamped after it, and nodes with none are left out."""
+    out = {}
+    for nid, f in _hist_flats(limit_per_node, since).items():
+        if since is not None and not f: continue
+        cols = out[nid] = {"t": [round(t, 2) for t in f[0::_HIST_W]]}
+        for i in range(1, _HIST_W): cols[HIST_FIELDS[i]] = [None if x != x else x for x in f[i::_HIST_W]]
+    return out
 
+def _history_json_snapshot(limit_per_node: int | None):
+    rows = {nid: _hist_rows(f) for nid, f in _hist_flats(limit_per_node).items()}
+    # NaN marks a missing value in the ring; clients expect null
+    return {nid: [{"t": round(t,2),
+                   "batt": None if b != b else b, "temp": None if tp != tp else tp,
+                   "press": None if p != p else p, "rh": None if rh != rh else rh,
+                   "rssi": None if r != r else r, "snr": None if sn != sn else sn}
+                  for (t, b, tp, p, rh, r, sn) in pts]
+            for nid, pts in rows.items()}
+
+# (version, my_id, [(peer, dm conv id)]) for every known node id
+_seed_cache: tuple[int, str | None, list[tuple[str, str]]] = (-1, None, [])
+def _seeded_convs() -> list[tuple[str, str]]:
+    """pair(!me|!peer) per known peer, or a degenerate pair(!peer|!peer) until my_id is known."""
+    global _seed_cache
+    ver, me = _known_ids_ver, my_id
+    c = _seed_cache
+    if c[0] == ver and c[1] == me: return c[2]
+    known_ids = set(node_names)
+    with nodes_lock:
+        known_ids.update(nodes)
+    if me: seeded = [(nid, pair_conv_id(me, nid)) for nid in known_ids if nid != me]
+    else: seeded = [(nid, f"pair:{nid}|{nid}") for nid in known_ids]
+    _seed_cache = (ver, me, seeded)
+    return seeded
+
+def _conv_label(cid: str) -> tuple[str, str | None, str]:
+    """(display name, peer whose activity stands in for an empty DM, lowercased sort name)."""
+    if cid == "^all": return ("Broadcast (^all)", None, "")
+    pair = parse_pair_conv(cid)
+    if not pair: return (cid, None, cid.lower())
+    a, b = pair
+    # Label: if degenerate (!peer|!peer) show single peer name
+    if a == b:
+        peer = a
+        nm = disp_name(peer)
+    elif my_id and (my_id == a or my_id == b):
+        peer = b if my_id == a else a
+        nm = disp_name(peer)
+    else:
+        peer = b
+        nm = f"{disp_name(a)} \u2194 {disp_name(b)}"
+    return (nm, peer, nm.lower())
+
+# (version, my_id, {conv id: label}): names only change with _known_ids_ver, so labels are built once per change
+_label_cache: tuple[int, str | None, dict] = (-1, None, {})
+def _conv_labels() -> dict:
+    global _label_cache
+    ver, me = _known_ids_ver, my_id
+    c = _label_cache
+    if c[0] == ver and c[1] == me: return c[2]
+    _label_cache = (ver, me, {})
+    return _label_cache[2]
+
+_conv_sort_key = itemgetter(0, 1, 2)   # (not broadcast, -last activity, lowercased name)
 def _conversations_snapshot():
     # How recent a node must be to appear in the list
-    with settings_lock:
-        recent_hours = as_int(settings.get("conv_recent_hours", 48), 48)
+    recent_hours = as_int(settings_cache.get("conv_recent_hours", 48), 48)
     cutoff = time.time() - recent_hours * 3600
 
     # Start with any conversations that already have messages
-    with msg_lock:
-        conv_keys = set(messages.keys())
+    conv_keys = _conv_ids()
 
     # Always include Broadcast
     conv_keys.add("^all")
 
-    # Collect known node IDs from names and live node state
-    known_ids = set(node_names.keys())
-    with nodes_lock:
-        known_ids.update(nodes.keys())
-
-    def last_activity_for(nid: str) -> float:
-        """Latest of node 'updated', DM last message, or broadcast from this nid."""
-        t = 0.0
-        with nodes_lock:
-            t = max(t, (nodes.get(nid) or {}).get("updated") or 0.0)
-
-        with msg_lock:
-            # DM last timestamp for the expected pair id
-            dm_key = pair_conv_id(my_id, nid) if my_id else f"pair:{nid}|{nid}"
-            t = max(t, last_msg_ts.get(dm_key, 0.0))
-            # Any broadcast from this nid
-            for m in messages.get("^all", deque()):
-                if m.get("fromId") == nid:
-                    t = max(t, m.get("epoch", 0.0))
-        return t
-
-    # Seed DM pairs:
-    # - If we know my_id: proper pair(!me|!peer)
-    # - If not: a safe degenerate pair(!peer|!peer) so you can still send
-    if my_id:
-        peers = [nid for nid in known_ids if nid != my_id]
-        for nid in peers:
-            if last_activity_for(nid) >= cutoff:
-                conv_keys.add(pair_conv_id(my_id, nid))
-    else:
-        for nid in known_ids:
-            if last_activity_for(nid) >= cutoff:
-                conv_keys.add(f"pair:{nid}|{nid}")
-
-    # Build list with names + last activity
-    out = []
-    for cid in conv_keys:
-        if cid == "^all":
-            nm = "Broadcast (^all)"
-            with msg_lock:
-                last_t = last_msg_ts.get(cid, 0.0)
-            out.append({"id": cid, "name": nm, "last_epoch": last_t})
-            continue
-
-        pair = parse_pair_conv(cid)
-        if not pair:
-            with msg_lock:
-                last_t = last_msg_ts.get(cid, 0.0)
-            out.append({"id": cid, "name": cid, "last_epoch": last_t})
-            continue
+    # Known peers and their DM ids only change when a new node id shows up
+    seeded = _seeded_convs()
 
-        a, b = pair
-        # Label: if degenerate (!peer|!peer) show single peer name
-        if a == b:
-            peer = a
-            nm = disp_name(peer)
-        elif my_id and (my_id == a or my_id == b):
-            peer = b if my_id == a else a
-            nm = disp_name(peer)
-        else:
-            peer = b
-            nm = f"{disp_name(a)} \u2194 {disp_name(b)}"
+    # Latest broadcast per sender is maintained on append, no scan of the ^all deque
+    last_bcast = last_bcast_ts
 
-        with msg_lock:
-            last_t = last_msg_ts.get(cid, 0.0)
-        if last_t == 0.0:
-            with nodes_lock:
-                last_t = (nodes.get(peer) or {}).get("updated") or 0.0
+    # Seed DM pairs whose peer was active (node 'updated', DM last message, or broadcast) since cutoff.
+    # Published node records are immutable, so single lookups need no lock.
+    upd = {nid: (nodes.get(nid) or {}).get("updated") or 0.0 for nid, _ in seeded}
+    for nid, dm_key in seeded:
+        if max(upd[nid], last_msg_ts.get(dm_key, 0.0), last_bcast.get(nid, 0.0)) >= cutoff:
+            conv_keys.add(dm_key)
 
-        out.append({"id": cid, "name": nm, "last_epoch": last_t})
+    # Build list with names + last activity
+    labels, out = _conv_labels(), []
+    for cid in conv_keys:
+        lab = labels.get(cid)
+        if lab is None: lab = labels[cid] = _conv_label(cid)
+        nm, peer, key = lab
+        last_t = last_msg_ts.get(cid, 0.0)
+        if last_t == 0.0 and peer is not None:
+            last_t = upd.get(peer)
+            if last_t is None: last_t = (nodes.get(peer) or {}).get("updated") or 0.0
+        out.append((cid != "^all", -last_t, key, {"id": cid, "name": nm, "last_epoch": last_t}))
 
-    # Broadcast pinned, then newest activity
-    out.sort(key=lambda x: (x["id"] != "^all", -x["last_epoch"], x["name"].lower()))
-    return out
+    # Broadcast pinned, then newest activity; the sort key is built by C code, with no lambda or .lower() per row
+    out.sort(key=_conv_sort_key)
+    return [x[3] for x in out]
 
+def _msg_epoch(m: dict) -> float: return m.get("epoch", 0)
 
 def _messages_snapshot(conv_id: str, limit: int | None = None, since: float | None = None, include_broadcast: bool = False):
-    with msg_lock: base = list(messages.get(conv_id, deque()))
+    # conversation deques are appended in time order, so merge the two tails instead of re-sorting
     pair = parse_pair_conv(conv_id)
+    base = _conv_tail(conv_id, since, limit)
     if include_broadcast and pair:
         a, b = pair
-        with msg_lock: bcast = list(messages.get("^all", deque()))
-        for m in bcast:
-            if m.get("fromId") in (a, b):
-                base.append(m | {"scope": "broadcast"})
-    base.sort(key=lambda m: m.get("epoch", 0))
-    if since is not None: base = [m for m in base if m.get("epoch", 0) > since]
-    if limit is not None: base = base[-limit:]
+        # everything stored under ^all already carries scope="broadcast"
+        bcast = _conv_tail("^all", since, limit, lambda m: m.get("fromId") in (a, b))
+        if not base: base = bcast   # nothing to interleave: the broadcast tail is already sorted and capped
+        elif bcast:
+            base = list(heapq.merge(base, bcast, key=_msg_epoch))
+            if limit is not None: base = base[-limit:]
     return base
 
 # --- HTML UI (simple, pretty, and settings page) ---
@@ -548,7 +1099,7 @@ pre{white-space:pre-wrap;font-family:ui-monospace,Consolas,Menlo,monospace}
 <div id="meta" style="color:#666;margin:6px 0 10px;"></div>
 <pre id="tbl">loading…</pre>
 <script>
-async function fetchNodes(){ const r=await fetch('/api/nodes?t='+Date.now(),{cache:'no-store'}); return await r.json(); }
+async function fetchNodes(){ const r=await fetch('/api/nodes'); return await r.json(); }
 function asTable(snap){
   const unit=(snap.settings&&snap.settings.unit_temp)||'F';
   const header = ["Node".padEnd(16),"Batt%","V","T(°"+unit+")","P(hPa)","RH%","RSSI","SNR","Lat","Lon","Alt","Last Text".padEnd(24),"Updated"].join(" | ");
@@ -592,8 +1143,6 @@ DASHBOARD_PRETTY = """<!doctype html>
 <html lang="en"><meta charset="utf-8"/>
 <title>Meshtastic Dashboard · Chat</title>
 <meta name="viewport" content="width=device-width, initial-scale=1"/>
-<link rel="preconnect" href="https://cdn.jsdelivr.net" crossorigin>
-<script src="https://cdn.jsdelivr.net/npm/chart.js@4.4.3"></script>
 <style>
 :root{--bg:#0b1020;--card:#121a2e;--muted:#8391a7;--fg:#e8efff;--ok:#21c07a;--warn:#f3b32a;--bad:#e35d6a;--line:#1f2b47;--accent:#6fb6ff;}
 *{box-sizing:border-box}
@@ -613,15 +1162,17 @@ h1{margin:0 0 10px;font-weight:650;letter-spacing:.2px}
 .kv a{margin-left:8px;color:var(--accent);text-decoration:none}
 .kv a:hover{text-decoration:underline}
 .bar{height:8px;background:#1c2944;border-radius:999px;overflow:hidden}
-.bar>span{display:block;height:100%;background:linear-gradient(90deg,#3577ff,#53d2ff)}
+.bar>span{display:block;height:100%;background:linear-gradient(90deg,#3577ff,#53d2ff);transform-origin:left;transform:scaleX(0)}
 .small{font-size:12px;color:var(--muted);margin-top:6px}
 canvas{width:100%;height:120px}
 .warn{color:var(--warn)} .bad{color:var(--bad)} .ok{color:var(--ok)}
-.table{margin-top:18px;border:1px solid var(--line);border-radius:10px;overflow:auto}
+.table{margin-top:18px;border:1px solid var(--line);border-radius:10px;overflow:auto;max-height:60vh}
 table{width:100%;border-collapse:collapse;background:var(--card)}
 th,td{padding:10px;border-bottom:1px solid var(--line);text-align:left;font-size:13px}
 th{color:var(--muted);font-weight:600;position:sticky;top:0;background:var(--card)}
 tr:last-child td{border-bottom:none}
+tr.pad td{padding:0;border:none}
+td{white-space:nowrap}
 /* Chat */
 .chat{display:grid;grid-template-columns:280px 1fr;gap:14px}
 .convlist{background:var(--card);border:1px solid var(--line);border-radius:12px;overflow:auto;max-height:70vh}
@@ -695,163 +1246,483 @@ tr:last-child td{border-bottom:none}
 </div>
 
 <script>
-let charts = {};
 let activeConv = null;
 let lastMsgSeen = 0;
-let myId=null, myName=null, names={};
-let sendTarget=null, convTimer=null, warnTimer=null;
+let myId=null, myName=null, names={}, namesVer=-1;
+let nodesStamp=0, nodesPromise=null;   // when myId/names/settings were last refreshed
+function applyNodeMeta(snap){
+  myId = snap.my_id || null; myName = snap.my_name || null;
+  // the server leaves names out while our ?nv= is current
+  if(snap.names) names = snap.names;
+  if(snap.names_ver != null) namesVer = snap.names_ver;
+  applySettings(snap.settings); nodesStamp = Date.now();
+}
+// the dashboard poll keeps the metadata current; only fetch when it's stale, sharing one in-flight request
+async function ensureNodes(maxAgeMs=1500){
+  if(Date.now()-nodesStamp < maxAgeMs) return;
+  if(!nodesPromise) nodesPromise = fetchJSON('/api/nodes?nv='+namesVer).then(applyNodeMeta).finally(()=>{ nodesPromise=null; });
+  await nodesPromise;
+}
+let sendTarget=null, warnTimer=null, warnDue=0;
 let SET = {unit_temp:'F', default_channel_index:0, want_ack_default:true};
+// unit-specialised converters and labels, rebuilt only when unit_temp changes (history temps are stored in °F)
+let unitFns = null;
+function rebuildUnitFns(){
+  const unit = (SET.unit_temp||'F').toUpperCase();
+  if(unitFns && unitFns.unit===unit) return;
+  const c2f = n=>Number(n)*9/5+32, f2c = n=>(Number(n)-32)*5/9;
+  unitFns = (unit==='F')
+    ? { unit, tempLabel:'°F', tempSeries:'Temp °F', histTemp: x=>x,
+        nodeTemp: v=> v.temp_f!=null? v.temp_f : (v.temp_c!=null? c2f(v.temp_c) : null) }
+    : { unit, tempLabel:'°C', tempSeries:'Temp °C', histTemp: x=> x==null? null : f2c(x),
+        nodeTemp: v=> v.temp_c!=null? v.temp_c : (v.temp_f!=null? f2c(v.temp_f) : null) };
+  document.getElementById('thTemp').textContent = 'T('+unitFns.tempLabel+')';   // the only unit-bearing header
+}
+function applySettings(s){ SET = Object.assign(SET, (s||{})); rebuildUnitFns(); }
+rebuildUnitFns();
 
 function battClass(b){ if(b==null) return ''; if(b<=15) return 'bad'; if(b<=30) return 'warn'; return 'ok'; }
 function battPct(b){ return (b==null)?0:Math.max(0,Math.min(100,Number(b)||0)); }
-function nice(v,d=2){ if(v==null||v===undefined) return '-'; const n=Number(v); return isFinite(n)?n.toFixed(d):v; }
-function timeStr(iso){ return iso ? new Date(iso).toLocaleTimeString() : '-'; }
+// integer rounding + manual zero padding; same output as toFixed for display-sized values
+const POW10 = [1,10,100,1000,10000,100000];
+function fixedStr(n,d){
+  const p = POW10[d], r = Math.round(Math.abs(n)*p), sign = (n<0 && r) ? '-' : '';
+  if(!d) return sign + r;
+  const ip = Math.floor(r/p), fp = String(r - ip*p);
+  return sign + ip + '.' + '0'.repeat(d - fp.length) + fp;
+}
+function nice(v,d=2){ if(v==null||v===undefined) return '-'; const n=Number(v); return isFinite(n)?fixedStr(n,d):v; }
+// one cached formatter (toLocaleTimeString's default fields) instead of a locale lookup per label
+const timeFmt = new Intl.DateTimeFormat(undefined, {hour:'numeric', minute:'2-digit', second:'2-digit'});
+function timeStr(iso){ return iso ? timeFmt.format(new Date(iso)) : '-'; }
 function dispName(id){ if(!id) return 'unknown'; if(id===myId) return myName || (names[id]||id); return names[id] || id; }
-async function fetchJSON(url, opts){ const r=await fetch(url,opts||{cache:'no-store'}); return await r.json(); }
+// polled endpoints carry ETags; keep the last body per URL and revalidate with If-None-Match,
+// so an unchanged poll is a bodiless 304 and no JSON parse
+const etagCache = new Map();   // url -> {etag, data}
+// polls share one AbortController, aborted when the tab is hidden so nothing is parsed or drawn in the background
+let pollAbort = new AbortController();
+async function fetchJSON(url, opts){
+  if(opts){ const r=await fetch(url,opts); return await r.json(); }
+  const hit = etagCache.get(url);
+  const r = await fetch(url, {cache:'no-store', signal: pollAbort.signal, headers: hit ? {'If-None-Match': hit.etag} : {}});
+  if(r.status===304 && hit) return hit.data;
+  const data = await r.json(), etag = r.headers.get('ETag');
+  etagCache.delete(url);
+  if(etag){
+    etagCache.set(url, {etag, data});
+    if(etagCache.size > 32) etagCache.delete(etagCache.keys().next().value);   // since= URLs never repeat for long
+  }
+  return data;
+}
+
+// id -> {card, tr, b, map, bar, small, tds, canvas, ctx, sig, histSig, ...}; built once per node, then patched in place
+const nodeViews = new Map();
+const SAFE_ID = /[^a-zA-Z0-9_]/g;
+// the card and row skeletons are parsed once; each new node clones them instead of re-running the HTML parser
+const CARD_TPL = (()=>{
+  const card = document.createElement('div');
+  card.className = 'card';
+  card.innerHTML = `
+      <h3></h3>
+      <div class="kv">
+        <div>Battery<b></b></div>
+        <div>Voltage<b></b></div>
+        <div>Temp<b></b></div>
+        <div>Pressure<b></b></div>
+        <div>RH<b></b></div>
+        <div>RSSI<b></b></div>
+        <div>SNR<b></b></div>
+        <div>GPS<b></b><a target="_blank" rel="noopener">map</a></div>
+        <div>Alt<b></b></div>
+        <div>Updated<b></b></div>
+      </div>
+      <div class="bar"><span></span></div>
+      <div class="small"></div>
+      <canvas></canvas>
+    `;
+  return card;
+})();
+const ROW_TPL = (()=>{ const tr = document.createElement('tr'); tr.innerHTML = '<td></td>'.repeat(12); return tr; })();
+function makeNodeView(id){
+  const card = CARD_TPL.cloneNode(true), tr = ROW_TPL.cloneNode(true);
+  const canvas = card.querySelector('canvas');
+  canvas.id = 'c_'+id.replace(SAFE_ID,'_');   // once per view; ticks use view.canvas directly
+  // one 2D context per canvas for its lifetime; resizing the backing store resets its state, not the object
+  return {card, tr, canvas, ctx: canvas.getContext('2d'), h3: card.querySelector('h3'), b: Array.from(card.querySelectorAll('b')),
+          map: card.querySelector('a'), bar: card.querySelector('.bar>span'), small: card.querySelector('.small'),
+          tds: Array.from(tr.children), sig: null, histSig: null, href: undefined, barW: null,
+          sizeSig: null, drawnAt: -Infinity, chartTimer: 0, bx: null, bb: null, bt: null};
+}
+// reading textContent costs no layout; writing even the same string re-creates the text node
+function setText(el, s){ if(el.textContent!==s) el.textContent = s; }
+// every field the card and row show (plus the unit they are shown in), so an equal signature means
+// an identical card and row; rssi/snr/to change on any packet, not only on ones that move 'updated'
+function nodeSig(v, uf){
+  return v.updated_iso+'|'+uf.unit+'|'+v.name+'|'+v.batt+'|'+v.voltage+'|'+v.temp_c+'|'+v.temp_f+'|'+
+    v.press_hpa+'|'+v.rh+'|'+v.rssi+'|'+v.snr+'|'+v.to+'|'+v.lat+'|'+v.lon+'|'+v.alt+'|'+v.text;
+}
+function updateNodeView(view, id, v, uf){
+  const sig = nodeSig(v, uf);
+  if(view.sig === sig) return;   // nothing about this node changed since the last poll
+  view.sig = sig;
+  const name = (v.name&&v.name.trim().length)?v.name:id;
+  const lat = (v.lat==null)? null : nice(v.lat,5);
+  const lon = (v.lon==null)? null : nice(v.lon,5);
+  const alt = (v.alt==null)? null : nice(v.alt,0);
+  const tDisp = nice(uf.nodeTemp(v),1), tLabel = uf.tempLabel;
+  const b = view.b, upd = timeStr(v.updated_iso);
+  const bc = battClass(v.batt);
+  setText(view.h3, name);
+  setText(b[0], nice(v.batt,0)+'%'); if(b[0].className!==bc) b[0].className = bc;
+  setText(b[1], nice(v.voltage,2)+' V');
+  setText(b[2], tDisp+' '+tLabel);
+  setText(b[3], nice(v.press_hpa,1)+' hPa');
+  setText(b[4], nice(v.rh,1)+' %');
+  setText(b[5], nice(v.rssi,0)+' dBm');
+  setText(b[6], nice(v.snr,2)+' dB');
+  setText(b[7], (lat && lon) ? (lat+', '+lon) : '-');
+  setText(b[8], alt ? (alt+' m') : '-');
+  setText(b[9], upd);
+  // style writes re-parse CSS and dirty style even when the value is the same, so compare against the last one
+  const href = (lat && lon) ? `https://maps.google.com/?q=${lat},${lon}` : null;
+  if(view.href !== href){
+    view.href = href;
+    if(href){ view.map.href = href; view.map.style.display=''; } else view.map.style.display='none';
+  }
+  // a transform only repaints the bar; a width change would re-lay out the card
+  const bw = 'scaleX('+(battPct(v.batt)/100)+')';
+  if(view.barW !== bw){ view.barW = bw; view.bar.style.transform = bw; }
+  setText(view.small, v.text||'-');
+
+  const cells=[name, nice(v.batt,0), nice(v.voltage,2), tDisp,
+    nice(v.press_hpa,1), nice(v.rh,1), nice(v.rssi,0), nice(v.snr,2),
+    lat==null?'-':lat, lon==null?'-':lon, alt==null?'-':alt, upd];
+  const tds = view.tds;
+  for(let i=0;i<cells.length;i++) setText(tds[i], String(cells[i]));
+  if(tds[1].className!==bc) tds[1].className = bc;
+}
+// --- sparklines: two polylines (battery on a 0-100 left scale, temp autoscaled right) straight on a 2D canvas ---
+const SPARK_H = 120, SPARK_BATT = '#36a2eb', SPARK_TEMP = '#ff6384', SPARK_GRID = '#1f2b47', SPARK_TXT = '#8391a7';
+function seriesRange(ys, lo, hi){
+  let mn = Infinity, mx = -Infinity;
+  for(const y of ys){ if(y==null || !isFinite(y)) continue; if(y<mn) mn=y; if(y>mx) mx=y; }
+  if(mn===Infinity) return null;
+  if(lo!=null && lo<mn) mn=lo;
+  if(hi!=null && hi>mx) mx=hi;
+  if(mn===mx){ mn-=1; mx+=1; }
+  return [mn, mx];
+}
+function drawSparkline(view, cw, xs, batt, temp, tempLabel){
+  const canvas = view.canvas, ctx = view.ctx;
+  const dpr = window.devicePixelRatio || 1, W = cw || 300, H = SPARK_H;
+  const pw = Math.round(W*dpr), ph = Math.round(H*dpr);
+  if(canvas.width!==pw) canvas.width = pw;   // only touch the backing store when the size really changed
+  if(canvas.height!==ph) canvas.height = ph;
+  ctx.setTransform(dpr,0,0,dpr,0,0); ctx.clearRect(0,0,W,H);
+  const l = 30, r = W-34, t = 16, b = H-12, iw = r-l, ih = b-t;
+  ctx.strokeStyle = SPARK_GRID; ctx.lineWidth = 1; ctx.beginPath();
+  for(let i=0;i<4;i++){ const y = Math.round(t + ih*i/3) + .5; ctx.moveTo(l,y); ctx.lineTo(r,y); }
+  ctx.stroke();
+  ctx.font = '10px system-ui,Segoe UI,Roboto,Arial,sans-serif'; ctx.textBaseline = 'top'; ctx.textAlign = 'left';
+  ctx.fillStyle = SPARK_BATT; ctx.fillText('Battery %', l, 2);
+  ctx.fillStyle = SPARK_TEMP; ctx.fillText(tempLabel, l+64, 2);
+  if(!xs.length) return;
+  const x0 = xs[0], xr = (xs[xs.length-1]-x0) || 1;
+  ctx.fillStyle = SPARK_TXT; ctx.textBaseline = 'bottom';
+  ctx.fillText(timeFmt.format(x0*1000), l, H);
+  ctx.textAlign = 'right'; ctx.fillText(timeFmt.format(xs[xs.length-1]*1000), r, H);
+  function line(ys, rng, color, labelX, align, d){
+    if(!rng) return;
+    const [mn, mx] = rng, k = ih/(mx-mn);
+    ctx.strokeStyle = color; ctx.lineWidth = 1.5; ctx.beginPath();
+    let pen = false;
+    for(let i=0;i<xs.length;i++){
+      const y = ys[i];
+      if(y==null || !isFinite(y)){ pen = false; continue; }   // gaps break the line
+      const px = l + (xs[i]-x0)/xr*iw, py = t + (mx-y)*k;
+      if(pen) ctx.lineTo(px,py); else { ctx.moveTo(px,py); ctx.lineTo(px+.5,py); pen = true; }
+    }
+    ctx.stroke();
+    ctx.fillStyle = SPARK_TXT; ctx.textAlign = align;
+    ctx.textBaseline = 'top'; ctx.fillText(fixedStr(mx,d), labelX, t-2);
+    ctx.textBaseline = 'bottom'; ctx.fillText(fixedStr(mn,d), labelX, b+2);
+  }
+  line(batt, seriesRange(batt, 0, 100), SPARK_BATT, l-4, 'right', 0);
+  line(temp, seriesRange(temp), SPARK_TEMP, r+4, 'left', 1);
+}
+// Largest-Triangle-Three-Buckets on one signal series; returns the kept indices (null: keep everything)
+// so battery and temperature are sampled at the same instants.
+function lttbIndices(xs, ys, threshold){
+  const n = xs.length;
+  if(threshold < 3 || n <= threshold) return null;
+  const ok = y => y!=null && isFinite(y);
+  const out = [0], every = (n-2)/(threshold-2);
+  let a = 0;
+  for(let i=0;i<threshold-2;i++){
+    const ns = Math.floor((i+1)*every)+1, ne = Math.min(Math.floor((i+2)*every)+1, n);
+    let ax = 0, ay = 0, c = 0;
+    for(let j=ns;j<ne;j++){ if(ok(ys[j])){ ax += xs[j]; ay += ys[j]; c++; } }
+    if(c){ ax /= c; ay /= c; }
+    const bs = Math.floor(i*every)+1, be = Math.floor((i+1)*every)+1, px = xs[a], py = ys[a];
+    let best = bs, bestArea = -1;
+    for(let j=bs;j<be;j++){
+      const area = (c && ok(py) && ok(ys[j])) ? Math.abs((px-ax)*(ys[j]-py) - (px-xs[j])*(ay-py)) : 0;
+      if(area > bestArea){ bestArea = area; best = j; }
+    }
+    out.push(best); a = best;
+  }
+  out.push(n-1);
+  return out;
+}
+// history arrives columnar ({t:[...], batt:[...], temp:[...], ...}), one array per field
+const NO_HIST = {t:[], batt:[], temp:[]};
+const CHART_MIN_MS = 4000;
+function updateNodeChart(view, h, uf, cw){
+  // cw is read by the caller for every chart before any is drawn (see drawCharts); the signature,
+  // the decimation target and the drawing all use it
+  const ht = h.t, n = ht.length, sizeSig = uf.unit+'|'+cw;
+  const histSig = n+'|'+(n? ht[n-1] : '')+'|'+sizeSig;
+  if(view.histSig === histSig) return;   // same series, same size: the last drawing is still right
+  // new points alone redraw at most every CHART_MIN_MS (the stream can report history several times a
+  // second); a trailing redraw picks up the latest series. Size and unit changes draw straight away
+  const now = performance.now(), wait = CHART_MIN_MS - (now - view.drawnAt);
+  if(view.sizeSig === sizeSig && wait > 0){
+    if(!view.chartTimer) view.chartTimer = setTimeout(()=>{ view.chartTimer = 0; scheduleCharts(); }, wait);
+    return;
+  }
+  view.histSig = histSig; view.sizeSig = sizeSig; view.drawnAt = now;
+  // pack into the view's typed arrays, NaN marking gaps; epoch seconds need float64, the values fit float32.
+  // The buffers live as long as the view and only grow, so a redraw allocates nothing but subarray views
+  if(!view.bx || view.bx.length < n){
+    const c = Math.max(n, 2*((view.bx && view.bx.length) || 0), 64);
+    view.bx = new Float64Array(c); view.bb = new Float32Array(c); view.bt = new Float32Array(c);
+  }
+  const conv = uf.histTemp, hb = h.batt, htp = h.temp, xs = view.bx, batt = view.bb, temp = view.bt;
+  let hasBatt = false;
+  for(let i=0;i<n;i++){
+    const b = hb[i], tp = conv(htp[i]);
+    xs[i] = ht[i]; batt[i] = b==null ? NaN : b; temp[i] = tp==null ? NaN : tp;
+    if(b!=null) hasBatt = true;
+  }
+  // never plot more than one point per two device pixels of width
+  const target = Math.max(50, Math.floor(cw*(window.devicePixelRatio||1)/2));
+  const idx = lttbIndices(xs.subarray(0,n), (hasBatt ? batt : temp).subarray(0,n), target);
+  let m = n;
+  if(idx){   // kept indices only increase (idx[j] >= j), so compacting in place never reads a slot already overwritten
+    m = idx.length;
+    for(let j=0;j<m;j++){ const i = idx[j]; xs[j] = xs[i]; batt[j] = batt[i]; temp[j] = temp[i]; }
+  }
+  drawSparkline(view, cw, xs.subarray(0,m), batt.subarray(0,m), temp.subarray(0,m), uf.tempSeries);
+}
 
+// all layout reads first, then all drawing: resizing a backing store between two clientWidth reads
+// would force a fresh layout for every card
+function drawCharts(views, hists, uf){
+  const widths = views.map(v=>v.canvas.clientWidth);
+  for(let i=0;i<views.length;i++) updateNodeChart(views[i], hists[i], uf, widths[i]);
+}
+let dashInFlight=false, pollInFlight=false;
+// resizing changes every sparkline's width; redraw them from the last history at most once per frame
+let lastHist = {}, chartsPending = false;
+function scheduleCharts(){
+  if(chartsPending) return;
+  chartsPending = true;
+  requestAnimationFrame(()=>{
+    chartsPending = false;
+    drawCharts(Array.from(nodeViews.values()), Array.from(nodeViews.keys(), id=>lastHist[id] || NO_HIST), unitFns);
+  });
+}
+window.addEventListener('resize', scheduleCharts);
+let lastOrder=[], lastOrderSig='';
+// after the first full load the dashboard asks only for history newer than what it holds and appends it.
+// The request reaches back HIST_SLACK seconds (a row can land in one shard while another is being read)
+// and mergeHist drops anything not newer than a node's last point
+const HIST_N = 150, HIST_SLACK = 10;
+let histSince = null;
+function mergeHist(delta, nodes, cap){
+  for(const id in lastHist) if(!(id in nodes)) delete lastHist[id];
+  for(const id in delta){
+    const d = delta[id], dt = d.t;
+    let cur = lastHist[id];
+    if(!cur){ cur = lastHist[id] = {}; for(const f in d) cur[f] = []; }   // own arrays: d may be a cached response
+    const ct = cur.t, lt = ct.length ? ct[ct.length-1] : -Infinity;
+    let i = 0;
+    while(i < dt.length && dt[i] <= lt) i++;
+    if(i === dt.length) continue;
+    for(const f in d) for(let j=i;j<dt.length;j++) cur[f].push(d[f][j]);
+    const cut = ct.length - cap;
+    if(cut > 0) for(const f in cur) cur[f].splice(0, cut);
+  }
+  histSince = null;
+  for(const id in lastHist){ const t = lastHist[id].t; if(t.length && (histSince==null || t[t.length-1] > histSince)) histSince = t[t.length-1]; }
+}
+// the table only holds the rows that can be in its scroll box (plus ROW_OVERSCAN either side); two
+// spacer rows stand in for the rest. Offscreen rows are still patched, but detached, so they cost no layout
+const tblBox = document.querySelector('#dash .table'), ROW_OVERSCAN = 5;
+const tblBody = document.querySelector('#tbl tbody'), padTop = makePadRow(), padBot = makePadRow();
+function makePadRow(){
+  const tr = document.createElement('tr'), td = document.createElement('td');
+  tr.className = 'pad'; td.colSpan = 12; tr.appendChild(td); return tr;
+}
+let rowViews = [], rowsShown = '', rowH = 0, rowsPending = false;
+function renderRows(){
+  const n = rowViews.length, top = tblBox.scrollTop, h = tblBox.clientHeight || window.innerHeight;
+  const rh = rowH || 38;   // a guess until the first real row has been measured
+  const first = Math.min(n, Math.max(0, Math.floor(top/rh) - ROW_OVERSCAN));   // the list may have shrunk under the scroll
+  const last = Math.min(n, Math.ceil((top+h)/rh) + ROW_OVERSCAN);
+  const key = first+':'+last;
+  if(key === rowsShown) return;   // scrolled within the same window: the rows in place are still right
+  rowsShown = key;
+  const tf = document.createDocumentFragment();
+  tf.appendChild(padTop);
+  for(let i=first;i<last;i++) tf.appendChild(rowViews[i].tr);
+  tf.appendChild(padBot);
+  padTop.style.height = (first*rh)+'px'; padBot.style.height = ((n-last)*rh)+'px';
+  tblBody.replaceChildren(tf);
+  // one forced layout, once: measure a real row so the window and spacers match the rendered height
+  if(!rowH && last > first){ rowH = rowViews[first].tr.offsetHeight; if(rowH){ rowsShown = ''; renderRows(); } }
+}
+function scheduleRows(){
+  if(rowsPending) return;
+  rowsPending = true;
+  requestAnimationFrame(()=>{ rowsPending = false; renderRows(); });
+}
+tblBox.addEventListener('scroll', scheduleRows, {passive:true});
+window.addEventListener('resize', scheduleRows);
+const pageVisible = ()=> document.visibilityState==='visible';
+let dashAgain=false, pollAgain=false, sending=false;
 async function loadDashboard(){
-  const sx = window.scrollX || 0, sy = window.scrollY || document.documentElement.scrollTop || 0;
-  const [snap, hist] = await Promise.all([
-    fetchJSON('/api/nodes?t='+Date.now()),
-    fetchJSON('/api/history?n=150&t='+Date.now())
-  ]);
-  myId = snap.my_id || null; myName = snap.my_name || null; names = snap.names || {};
-  SET = Object.assign(SET, (snap.settings||{}));
-  const unit = (SET.unit_temp||'F').toUpperCase();
-  document.getElementById('thTemp').textContent = 'T(°'+unit+')';
+  if(!pageVisible()) return;
+  if(dashInFlight){ dashAgain=true; return; }   // one refresh at a time; a change seen meanwhile reruns it once
+  dashInFlight=true;
+  try{ do{ dashAgain=false; await refreshDashboard(); } while(dashAgain && dashShown()); } finally{ dashInFlight=false; }
+}
+async function refreshDashboard(){
+  // nodes + history in one round trip
+  const snap = await fetchJSON('/api/dashboard?n='+HIST_N+'&nv='+namesVer+(histSince!=null ? '&hsince='+(histSince-HIST_SLACK) : ''));
+  applyNodeMeta(snap);
+  mergeHist(snap.history || {}, snap.nodes, Math.min(HIST_N, (snap.settings||{}).history_maxlen || HIST_N));
+  const hist = lastHist;
+  const uf = unitFns;
 
-  document.getElementById('meta').textContent =
-    `connected=${snap.connected} | server=${snap.server_time} | nodes=${Object.keys(snap.nodes).length}`;
+  setText(document.getElementById('meta'),
+    `connected=${snap.connected} | server=${snap.server_time} | nodes=${Object.keys(snap.nodes).length}`);
 
   const cards = document.getElementById('cards');
-  for (const k in charts){ try{ charts[k].destroy(); }catch(e){} delete charts[k]; }
-  cards.innerHTML = '';
+  let dropped = false;
+  for(const [id, view] of nodeViews){
+    if(id in snap.nodes) continue;
+    view.card.remove(); view.tr.remove(); clearTimeout(view.chartTimer); nodeViews.delete(id); dropped = true;
+  }
 
-  const entries = Object.entries(snap.nodes).sort((a,b)=>(b[1].updated_epoch||0)-(a[1].updated_epoch||0));
+  // a quiet mesh keeps the same (id, updated) set between ticks; reuse the last order instead of re-sorting
+  let orderSig = '';
+  for(const id in snap.nodes) orderSig += id+':'+(snap.nodes[id].updated_epoch||0)+'|';
+  if(orderSig !== lastOrderSig){
+    lastOrder = Object.keys(snap.nodes).sort((a,b)=>(snap.nodes[b].updated_epoch||0)-(snap.nodes[a].updated_epoch||0));
+    lastOrderSig = orderSig;
+  }
+  const entries = lastOrder.map(id=>[id, snap.nodes[id]]);
+  const views = [];
+  // a departed node leaves the card count matching, but rowViews still holds its view: rebuild the rows too
+  let moved = dropped || cards.children.length !== entries.length;
   for(const [id, v] of entries){
-    const name = (v.name&&v.name.trim().length)?v.name:id;
-    const h = hist[id] || [];
-    const cid = 'c_'+id.replace(/[^a-zA-Z0-9_]/g,'_');
-    const lat = (v.lat==null)? null : Number(v.lat).toFixed(5);
-    const lon = (v.lon==null)? null : Number(v.lon).toFixed(5);
-    const alt = (v.alt==null)? null : Number(v.alt).toFixed(0);
-    const mapLink = (lat && lon) ? `<a href="https://maps.google.com/?q=${lat},${lon}" target="_blank" rel="noopener">map</a>` : '';
-
-    // temperature per unit
-    const tDisp = (unit==='F')
-      ? (v.temp_f!=null? nice(v.temp_f,1) : (v.temp_c!=null? nice((Number(v.temp_c)*9/5+32),1) : '-'))
-      : (v.temp_c!=null? nice(v.temp_c,1) : (v.temp_f!=null? nice(((Number(v.temp_f)-32)*5/9),1) : '-'));
-    const tLabel = unit==='F' ? '°F' : '°C';
-
-    const card = document.createElement('div');
-    card.className = 'card';
-    card.innerHTML = `
-      <h3>${name}</h3>
-      <div class="kv">
-        <div>Battery<b class="${battClass(v.batt)}">${nice(v.batt,0)}%</b></div>
-        <div>Voltage<b>${nice(v.voltage,2)} V</b></div>
-        <div>Temp<b>${tDisp} ${tLabel}</b></div>
-        <div>Pressure<b>${nice(v.press_hpa,1)} hPa</b></div>
-        <div>RH<b>${nice(v.rh,1)} %</b></div>
-        <div>RSSI<b>${nice(v.rssi,0)} dBm</b></div>
-        <div>SNR<b>${nice(v.snr,2)} dB</b></div>
-        <div>GPS<b>${lat && lon ? (lat+', '+lon) : '-'}</b>${mapLink}</div>
-        <div>Alt<b>${alt ? (alt+' m') : '-'}</b></div>
-        <div>Updated<b>${timeStr(v.updated_iso)}</b></div>
-      </div>
-      <div class="bar"><span style="width:${battPct(v.batt)}%"></span></div>
-      <div class="small">${(v.text||'-')}</div>
-      <canvas id="${cid}"></canvas>
-    `;
-    cards.appendChild(card);
-
-    const ctx = card.querySelector('canvas').getContext('2d');
-    const labels = h.map(p => new Date(p.t*1000).toLocaleTimeString());
-    const dsBatt = h.map(p => p.batt);
-    const dsTempF = h.map(p => p.temp);
-    const dsTemp = (unit==='F') ? dsTempF
-      : dsTempF.map(x => (x==null? null : ((Number(x)-32)*5/9)));
-    const tempSeriesLabel = (unit==='F') ? 'Temp °F' : 'Temp °C';
-    charts[cid]=new Chart(ctx, {
-      type:'line',
-      data:{labels, datasets:[
-        {label:'Battery %', data: dsBatt, yAxisID:'y1', tension:.3},
-        {label: tempSeriesLabel, data: dsTemp, yAxisID:'y2', tension:.3}
-      ]},
-      options:{
-        animation:false,
-        plugins:{legend:{labels:{color:'#e8efff'}}},
-        scales:{
-          x:{ticks:{color:'#8391a7'} , grid:{color:'#1f2b47'}},
-          y1:{position:'left', suggestedMin:0, suggestedMax:100, ticks:{color:'#8391a7'}, grid:{color:'#1f2b47'}},
-          y2:{position:'right', ticks:{color:'#8391a7'}, grid:{display:false}}
-        }
-      }
-    });
+    let view = nodeViews.get(id);
+    if(!view){ view = makeNodeView(id); nodeViews.set(id, view); }
+    updateNodeView(view, id, v, uf);
+    if(!moved && cards.children[views.length]!==view.card) moved = true;
+    views.push(view);
   }
-
-  const tbody = document.querySelector('#tbl tbody'); tbody.innerHTML='';
-  for(const [id,v] of entries){
-    const name=(v.name&&v.name.trim().length)?v.name:id;
-    const t = (unit==='F')
-      ? (v.temp_f!=null? Number(v.temp_f).toFixed(1) : (v.temp_c!=null? (Number(v.temp_c)*9/5+32).toFixed(1) : '-'))
-      : (v.temp_c!=null? Number(v.temp_c).toFixed(1) : (v.temp_f!=null? ((Number(v.temp_f)-32)*5/9).toFixed(1) : '-'));
-    const tr=document.createElement('tr');
-    const cells=[name, nice(v.batt,0), nice(v.voltage,2), t,
-      nice(v.press_hpa,1), nice(v.rh,1), nice(v.rssi,0), nice(v.snr,2),
-      v.lat==null?'-':Number(v.lat).toFixed(5),
-      v.lon==null?'-':Number(v.lon).toFixed(5),
-      v.alt==null?'-':Number(v.alt).toFixed(0),
-      timeStr(v.updated_iso)];
-    cells.forEach((c,idx)=>{
-      const td=document.createElement('td'); td.textContent=c;
-      if(idx===1){ if(v.batt!=null){ const b=Number(v.batt); if(b<=15) td.className='bad'; else if(b<=30) td.className='warn'; else td.className='ok'; } }
-      tr.appendChild(td);
-    });
-    tbody.appendChild(tr);
+  // a steady ordering touches no DOM at all; otherwise place everything in one fragment per container
+  if(moved){
+    const cf = document.createDocumentFragment();
+    for(const view of views) cf.appendChild(view.card);
+    cards.replaceChildren(cf);
+    rowViews = views; rowsShown = ''; renderRows();
   }
-
-  requestAnimationFrame(()=>{ window.scrollTo(sx, sy); });
+  // sparklines size themselves from the laid-out canvas, so draw once the cards are in place
+  drawCharts(views, entries.map(([id])=>hist[id] || NO_HIST), uf);
 }
 
 // --- Chat ---
+// conversation names are node names chosen by whoever owns the radio: set as text, never parsed as HTML
+const CONV_BTN_TPL = (()=>{
+  const btn=document.createElement('button'), span=document.createElement('span');
+  span.className='name'; btn.appendChild(span);
+  return btn;
+})();
+let lastConvs = null;
 async function loadConversations(){
-  const convs = await fetchJSON('/api/conversations?t='+Date.now());
-  const wrap = document.getElementById('conv'); wrap.innerHTML='';
+  const convs = await fetchJSON('/api/conversations');
+  // a 304 hands back the very same array: the buttons on screen are already right (setActiveConvButton keeps the highlight)
+  if(convs === lastConvs) return;
+  lastConvs = convs;
+  const wrap = document.getElementById('conv'), frag = document.createDocumentFragment();
+  activeBtn = null;
   for(const c of convs){
-    const btn=document.createElement('button');
+    const btn=CONV_BTN_TPL.cloneNode(true);
     btn.dataset.id = c.id;
     btn.onclick = ()=> selectConv(c.id, c.name);
-    btn.innerHTML = `<span class="name">${c.name}</span>`;
-    if (activeConv && c.id===activeConv) btn.classList.add('active');
-    wrap.appendChild(btn);
+    btn.firstChild.textContent = c.name;
+    if (activeConv && c.id===activeConv){ btn.classList.add('active'); activeBtn = btn; }
+    frag.appendChild(btn);
   }
+  wrap.replaceChildren(frag);
 }
+// only the previously active button and the new one change class
+let activeBtn = null;
 function setActiveConvButton(){
-  const wrap = document.getElementById('conv');
-  Array.from(wrap.querySelectorAll('button')).forEach(b=>{
-    if(b.dataset.id===activeConv) b.classList.add('active'); else b.classList.remove('active');
-  });
+  activeBtn?.classList.remove('active');
+  activeBtn = activeConv ? document.getElementById('conv').querySelector(`button[data-id="${CSS.escape(activeConv)}"]`) : null;
+  activeBtn?.classList.add('active');
 }
+// bubble skeleton (tag, text, meta) built once; each message is a deep clone with its fields filled in
+const BUBBLE_TPL = (()=>{
+  const div=document.createElement('div'), tag=document.createElement('span'), meta=document.createElement('div');
+  tag.className='tag'; tag.textContent='broadcast'; meta.className='meta';
+  div.append(tag, document.createTextNode(''), meta);
+  return div;
+})();
 function renderMsg(m){
   const me = (myId && m.fromId===myId);
-  const div=document.createElement('div');
+  const div = BUBBLE_TPL.cloneNode(true), [tag, body, meta] = div.childNodes;
   div.className='bubble ' + (me?'me':'them');
   const who = me ? 'You' : (dispName(m.fromId || ''));
-  const tag = (m.scope==='broadcast') ? `<span class="tag">broadcast</span>` : '';
-  div.innerHTML = `${tag}${m.text}<div class="meta">${who} · ${new Date(m.epoch*1000).toLocaleTimeString()}${m.rssi!=null? ' · rssi '+m.rssi:''}</div>`;
+  // textContent/data only: no HTML parse per bubble, and message text can't inject markup
+  if(m.scope!=='broadcast') tag.remove();
+  body.data = m.text==null ? '' : m.text;
+  meta.textContent = `${who} · ${timeFmt.format(m.epoch*1000)}${m.rssi!=null? ' · rssi '+m.rssi:''}`;
   return div;
 }
-async function fetchMessages(conv, since, includeBroadcast){
+// the thread keeps at most MAX_BUBBLES messages in the DOM; older ones drop off the top as new ones arrive
+const MAX_BUBBLES = 300;
+function appendBubbles(box, msgs){
+  const frag = document.createDocumentFragment();
+  for(let i=Math.max(0, msgs.length-MAX_BUBBLES); i<msgs.length; i++) frag.appendChild(renderMsg(msgs[i]));
+  box.appendChild(frag);
+  for(let extra = box.childElementCount - MAX_BUBBLES; extra > 0; extra--) box.firstElementChild.remove();
+}
+async function fetchMessages(conv, since, includeBroadcast, wait, n){
   const url = `/api/messages?conv=${encodeURIComponent(conv)}`
     + (since?('&since='+since):'')
+    + (n? '&n='+n : '')
     + (includeBroadcast? '&include_broadcast=1' : '')
-    + '&t='+Date.now();
+    + (wait? '&wait='+wait : '');
   return await fetchJSON(url);
 }
+// [a, b] for a "pair:a|b" id, else null; parsed once per id (the page only ever sees a few hundred)
+const pairCache = new Map();
+function parsePair(cid){
+  let p = pairCache.get(cid);
+  if(p !== undefined) return p;
+  const i = cid.indexOf('|');
+  p = (cid.startsWith('pair:') && i > 0) ? [cid.slice(5, i), cid.slice(i+1)] : null;
+  pairCache.set(cid, p);
+  return p;
+}
 function headerFor(cid){
   if (cid === '^all') return 'Broadcast (^all)';
-  const pair = cid.startsWith('pair:') ? cid.slice(5).split('|') : null;
+  const pair = parsePair(cid);
   if (!pair) return cid;
   const [a,b] = pair;
   if (a === b) return dispName(a); // degenerate pair → show single peer
@@ -865,15 +1736,13 @@ function headerFor(cid){
 let chatVisible=false;
 async function selectConv(id){
   activeConv = id; lastMsgSeen = 0;
-  const snap = await fetchJSON('/api/nodes?t='+Date.now());
-  myId = snap.my_id || null; myName = snap.my_name || null; names = snap.names || {};
-  SET = Object.assign(SET, (snap.settings||{}));
+  await ensureNodes();
   const includeB = (id !== '^all');
-  const list = await fetchMessages(id, null, includeB);
+  const list = await fetchMessages(id, null, includeB, 0, MAX_BUBBLES);   // only what the thread will show
 
   function peerFromConv(){
     if(id==='^all') return '^all';
-    const pair = id.startsWith('pair:') ? id.slice(5).split('|') : null;
+    const pair = parsePair(id);
     if(!pair) return null;
     const [a,b] = pair;
     if(myId && (myId===a || myId===b)) return (myId===a)? b : a;
@@ -890,32 +1759,48 @@ async function selectConv(id){
   document.getElementById('sendBtn').disabled = false;
   document.getElementById('msgBox').disabled = false;
 
-  const box = document.getElementById('msgs'); box.innerHTML='';
-  list.forEach(m=> box.appendChild(renderMsg(m)));
+  const box = document.getElementById('msgs');
+  box.replaceChildren(); appendBubbles(box, list);
   box.scrollTop = box.scrollHeight;
   if(list.length) lastMsgSeen = list[list.length-1].epoch;
   setActiveConvButton();
 }
 async function pollActive(){
-  if(!activeConv || !chatVisible) return;
+  if(!activeConv || !chatVisible || !pageVisible()) return;
+  if(pollInFlight || sending){ pollAgain=true; return; }   // mid-send, the stream's event would fetch our own message back
+  pollInFlight=true;
+  try{ do{ pollAgain=false; await pollActiveOnce(); } while(pollAgain); } finally{ pollInFlight=false; }
+}
+async function pollActiveOnce(){
   const includeBroadcast = (activeConv !== '^all');
   const box = document.getElementById('msgs');
   const nearBottom = (box.scrollHeight - box.scrollTop - box.clientHeight) < 120;
-  const inc = await fetchMessages(activeConv, lastMsgSeen || 0, includeBroadcast);
+  // without the stream, the server holds the request until a message arrives (long-poll)
+  const conv = activeConv, since = lastMsgSeen || 0;
+  let inc = await fetchMessages(conv, since, includeBroadcast, streamLive ? 0 : 25);
+  if(conv !== activeConv) return;   // the user switched threads while the request was parked
+  if(lastMsgSeen !== since) inc = inc.filter(m=> m.epoch > lastMsgSeen);   // a send meanwhile already drew its bubble
   if(inc.length){
-    inc.forEach(m=> box.appendChild(renderMsg(m)));
+    appendBubbles(box, inc);
     lastMsgSeen = inc[inc.length-1].epoch;
-    if(nearBottom) box.scrollTop = box.scrollHeight;
+    if(nearBottom) requestAnimationFrame(()=>{ box.scrollTop = box.scrollHeight; });
   }
 }
+// one pending "unconfirmed" warning at most; a hidden tab drops the timer and
+// visibilitychange re-arms it for whatever is left of the 15 s
+function armSendWarn(){
+  clearTimeout(warnTimer); warnTimer = null;
+  if(!warnDue || !pageVisible()) return;
+  warnTimer = setTimeout(()=>{ warnTimer = null; warnDue = 0; showSendWarn(true); }, Math.max(0, warnDue - performance.now()));
+}
 function showSendWarn(show){ const el=document.getElementById('sendWarn'); if(show) el.classList.remove('hide'); else el.classList.add('hide'); }
 async function sendCurrent(){
   const input = document.getElementById('msgBox');
   const btn = document.getElementById('sendBtn');
   const text = input.value.trim();
-  if(!text){ return; }
+  if(!text || sending){ return; }   // a second Enter while the POST is out would send the text twice
   if(!activeConv){ alert('Pick a conversation'); return; }
-  btn.disabled = true; showSendWarn(false);
+  btn.disabled = true; showSendWarn(false); sending = true;
   try{
     const payload = (activeConv==='^all')
       ? { to: '^all', text, channelIndex: (SET.default_channel_index??0), wantAck: (SET.want_ack_default??true) }
@@ -928,25 +1813,67 @@ async function sendCurrent(){
       const box = document.getElementById('msgs');
       const m = { epoch: now, fromId: myId||'me', toId: (payload.to===''?undefined:payload.to), text: text, scope: (activeConv==='^all'?'broadcast':'dm') };
       const dom = renderMsg(m);
-      const meta = dom.querySelector('.meta'); if(meta){ meta.textContent += ' · ✓ sent'; }
-      box.appendChild(dom); box.scrollTop = box.scrollHeight;
+      dom.lastChild.textContent += ' · ✓ sent';   // BUBBLE_TPL ends with the meta line
+      box.appendChild(dom);
+      if(box.childElementCount > MAX_BUBBLES) box.firstElementChild.remove();
+      requestAnimationFrame(()=>{ box.scrollTop = box.scrollHeight; });   // read the new height at frame time, not mid-handler
       lastMsgSeen = now; input.value = '';
-      clearTimeout(warnTimer); warnTimer = setTimeout(()=>{ showSendWarn(true); }, 15000);
+      warnDue = performance.now() + 15000; armSendWarn();
     }
   }catch(e){ alert('Send error'); }
-  finally{ btn.disabled = false; input.focus(); }
+  finally{ btn.disabled = false; input.focus(); sending = false; if(pollAgain) pollActive(); }
 }
 const tabDash = document.getElementById('tabDash');
 const tabChat = document.getElementById('tabChat');
 const viewDash = document.getElementById('dash');
 const viewChat = document.getElementById('chat');
-tabDash.onclick = ()=>{ chatVisible=false; clearInterval(convTimer); tabDash.classList.add('active'); tabChat.classList.remove('active'); viewDash.classList.remove('hide'); viewChat.classList.add('hide'); };
-tabChat.onclick = async ()=>{ chatVisible=true; tabChat.classList.add('active'); tabDash.classList.remove('active'); viewChat.classList.remove('hide'); viewDash.classList.add('hide'); await loadConversations(); clearInterval(convTimer); convTimer=setInterval(loadConversations, 3000); };
+const dashShown = ()=> pageVisible() && !viewDash.classList.contains('hide');
+tabDash.onclick = ()=>{ chatVisible=false; tabDash.classList.add('active'); tabChat.classList.remove('active'); viewDash.classList.remove('hide'); viewChat.classList.add('hide'); loadDashboard(); };
+tabChat.onclick = async ()=>{ chatVisible=true; tabChat.classList.add('active'); tabDash.classList.remove('active'); viewChat.classList.remove('hide'); viewDash.classList.add('hide'); await loadConversations(); };
 document.getElementById('sendBtn').onclick = sendCurrent;
-document.getElementById('msgBox').addEventListener('keydown', (e)=>{ if(e.key==='Enter'){ sendCurrent(); } });
-setInterval(loadDashboard, 2000);
-setInterval(pollActive, 1000);
-loadDashboard();
+document.getElementById('msgBox').addEventListener('keydown', (e)=>{ if(e.key==='Enter' && !e.repeat && !e.isComposing){ sendCurrent(); } });
+// /api/stream names the data that changed and the page refetches just that; the self-scheduling
+// polls below only run while the stream is down (no EventSource, or reconnecting), and the
+// message poll is then a long-poll that returns as soon as something arrives
+let streamLive=false, convTicks=0;
+// a hidden tab leaves its tickers unarmed (no timer wake-ups at all); becoming visible re-arms them.
+// live=true keeps a ticker going while the stream is up, leaving when() to decide how often it runs
+const tickers = [];
+function every(ms, fn, when, live=false){
+  let timer = 0;
+  const arm = ()=>{ if(!timer && pageVisible()) timer = setTimeout(tick, ms); };
+  async function tick(){ timer = 0; if((live || !streamLive) && when()){ try{ await fn(); }catch(e){} } arm(); }
+  tickers.push(arm);
+  tick();
+}
+every(2000, loadDashboard, dashShown);
+every(1000, pollActive, ()=> chatVisible && pageVisible());
+// the list also follows node names and a clock-based recency cutoff, which the stream doesn't signal, so it still refreshes every 30 s while live
+every(3000, loadConversations, ()=> chatVisible && pageVisible() && (!streamLive || ++convTicks % 10 === 0), true);
+if(window.EventSource){
+  const es = new EventSource('/api/stream');
+  const onData = ()=>{ if(dashShown()) loadDashboard().catch(()=>{}); };
+  const onMsgs = (e)=>{
+    if(!pageVisible()) return;
+    // the event names the conversations that moved: skip the refetch when the open thread isn't one
+    // of them (a DM thread also shows its peers' broadcasts)
+    let convs = null;
+    try{ convs = e && JSON.parse(e.data).convs; }catch(_){}
+    if(!convs || convs.includes(activeConv) || (activeConv!=='^all' && convs.includes('^all'))) pollActive().catch(()=>{});
+    if(chatVisible) loadConversations().catch(()=>{});
+  };
+  es.onopen = ()=>{ streamLive=true; onData(); onMsgs(); };   // catch up on anything missed while reconnecting
+  es.onerror = ()=>{ streamLive=false; };
+  es.addEventListener('nodes', onData);
+  es.addEventListener('history', onData);
+  es.addEventListener('messages', onMsgs);
+}
+document.addEventListener('visibilitychange', ()=>{
+  armSendWarn();
+  if(!pageVisible()){ pollAbort.abort(); pollAbort = new AbortController(); return; }   // incl. a parked long-poll
+  if(dashShown()) loadDashboard().catch(()=>{}); else pollActive().catch(()=>{});
+  for(const arm of tickers) arm();
+});
 </script>
 """
 
@@ -1027,7 +1954,7 @@ button, a.btn{background:#6fb6ff;border:none;color:#08111f;padding:10px 14px;bor
 </div>
 <script>
 async function load(){
-  const r = await fetch('/api/settings/get?t='+Date.now());
+  const r = await fetch('/api/settings/get');
   const s = await r.json();
   document.getElementById('unit').value = (s.unit_temp||'F').toUpperCase();
   document.getElementById('ch').value = s.default_channel_index ?? 0;
@@ -1060,180 +1987,390 @@ load();
 </script>
 """
 
+# the pages never change at runtime: encode, compress and tag each once, keyed by the page string itself
+HTML_MAX_AGE = 60   # seconds a browser may reuse a page before revalidating it
+def _html_entry(page: str) -> tuple[bytes, bytes, str]:
+    raw = page.encode("utf-8")
+    return raw, gzip.compress(raw, 6, mtime=0), '"' + hashlib.sha1(raw).hexdigest()[:16] + '"'
+_HTML = {page: _html_entry(page) for page in (DASHBOARD_SIMPLE, DASHBOARD_PRETTY, SETTINGS_HTML)}
+
 # --- HTTP Handler ---
 class ApiHandler(BaseHTTPRequestHandler):
     server_version = "MeshDash/14-settings"
+    protocol_version = "HTTP/1.1"   # keep-alive: the 1-2 s pollers reuse one connection instead of reconnecting
+    timeout = 30   # a client that connects and goes quiet gives its API_MAX_THREADS slot back
+    disable_nagle_algorithm = True   # large bodies and SSE frames follow the headers as separate writes; don't hold them for an ACK
 
-    def _hdr_json(self, code=200):
+    def _hdr_json(self, code=200, etag=None, length=None, gz=False, ctype="application/json; charset=utf-8", body=None,
+                  vary="Accept-Encoding"):
         self.send_response(code)
-        self.send_header("Content-Type","application/json; charset=utf-8")
-        self.send_header("Cache-Control","no-store, no-cache, must-revalidate")
-        self.send_header("Pragma","no-cache")
+        self.send_header("Content-Type", ctype)
+        if length is not None: self.send_header("Content-Length", str(length))
+        if gz: self.send_header("Content-Encoding","gzip")
+        if gz or etag: self.send_header("Vary", vary)
+        if self.close_connection: self.send_header("Connection","close")
+        if etag:   # cacheable, but revalidated on every poll
+            self.send_header("Cache-Control","no-cache")
+            self.send_header("ETag", etag)
+        else:
+            self.send_header("Cache-Control","no-store, no-cache, must-revalidate")
+            self.send_header("Pragma","no-cache")
         self.send_header("Access-Control-Allow-Origin","*")
+        if body is None: self.end_headers()
+        else: self._end_with_body(body)
+
+    def _end_with_body(self, body: bytes):
+        # small bodies ride in the same send as the headers: one syscall and, with Nagle off, one segment
+        # per response instead of two. Larger ones are written separately rather than copied into the join
+        if len(body) > COALESCE_MAX:
+            self.end_headers(); self.wfile.write(body); return
+        out, self.wfile = self.wfile, io.BytesIO()   # end_headers writes the header block here, not to the socket
+        try: self.end_headers()
+        finally: hdr, self.wfile = self.wfile.getvalue(), out
+        out.write(hdr + body)   # empty hdr for an HTTP/0.9 request, which has no header block
+
+    def _accepts_gzip(self) -> bool:
+        return "gzip" in (self.headers.get("Accept-Encoding") or "")
+
+    def _send_bytes(self, body: bytes, etag=None, code=200, gz=None, **hdr):
+        # body is already encoded (usually straight from _json_cache), so its length is known up front.
+        # gz=None: compress here if it pays; True/False: the caller already decided (see _send_cached)
+        if gz is None:
+            gz = len(body) >= GZIP_MIN_BYTES and self._accepts_gzip()
+            if gz: body = _gzip(body)
+        self._hdr_json(code, etag, len(body), gz, body=body, **hdr)
+
+    def _send_cached(self, key: str, etag: str, build):
+        # the encoded body and its gzip are both cached per ETag, so a change is compressed once, not per client
+        body = _cached_json(key, etag, build)
+        if len(body) >= GZIP_MIN_BYTES and self._accepts_gzip(): self._send_bytes(_cached_gzip(key, etag, body), etag, gz=True)
+        else: self._send_bytes(body, etag, gz=False)
+
+    def _send_html(self, page: str):
+        raw, gz, etag = _HTML[page]
+        cache = f"max-age={HTML_MAX_AGE}"
+        if self._not_modified(etag, cache): return
+        if not self._accepts_gzip(): gz = None
+        body = gz or raw
+        self.send_response(200)
+        self.send_header("Content-Type","text/html; charset=utf-8")
+        self.send_header("Cache-Control", cache)
+        self.send_header("ETag", etag)
+        if gz: self.send_header("Content-Encoding","gzip")
+        self.send_header("Vary","Accept-Encoding")
+        self.send_header("Content-Length", str(len(body)))
+        self._end_with_body(body)
+
+    def _stream_events(self):
+        # Server-Sent Events: one "event: <kind>" per data stamp that moved; the page then refetches
+        # that endpoint (a conditional GET), so the stream never carries or re-encodes the data itself.
+        # "messages" also lists the conversations that moved
+        self.close_connection = True   # open-ended body, no Content-Length
+        self.send_response(200)
+        self.send_header("Content-Type","text/event-stream")
+        self.send_header("Cache-Control","no-cache")
+        self.send_header("Connection","close")
+        self.end_headers()
+        seen = dict(_data_ver)
+        try:
+            self.wfile.write(b"retry: 3000\n\n")
+            while True:
+                with _ver_cond: _ver_cond.wait_for(lambda: _data_ver != seen, SSE_KEEPALIVE)
+                cur = dict(_data_ver)
+                out = "".join(f"event: {k}\ndata: {v}\n\n" for k, v in cur.items() if seen[k] != v and k != "messages")
+                if seen["messages"] != cur["messages"]:
+                    # name the conversations that moved, so a page showing another one can skip its refetch
+                    since = seen["messages"]
+                    convs = [c for c, q in list(last_msg_seq.items()) if q > since]
+                    out += "event: messages\ndata: " + _json_bytes({"v": cur["messages"], "convs": convs}).decode() + "\n\n"
+                out = out or ": ping\n\n"
+                seen = cur
+                self.wfile.write(out.encode())
+                time.sleep(SSE_MIN_GAP)
+        except (OSError, ValueError): pass   # client went away
+
+    def _send_json(self, obj, code=200):
+        self._send_bytes(_json_bytes(obj), code=code)
+
+    def _not_modified(self, etag: str, cache: str = "no-cache", vary: str = None) -> bool:
+        inm = self.headers.get("If-None-Match")
+        if not inm or etag not in (t.strip() for t in inm.split(",")): return False
+        self.send_response(304)
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", cache)
+        if vary: self.send_header("Vary", vary)
         self.end_headers()
+        return True
 
     def _read_json(self):
         length = int(self.headers.get("Content-Length","0") or "0")
         data = self.rfile.read(length) if length>0 else b""
-        try: return json.loads(data.decode("utf-8"))
+        try: return _json_loads(data)
         except Exception: return {}
 
-    def do_POST(self):
+    def _query(self) -> dict:
+        # only the routes that take parameters parse the query string
+        return parse_qs(self._qstr) if self._qstr else {}
+
+    def _split_path(self) -> str:
+        raw = self.path; q = raw.find("?")
+        if q < 0: self._qstr = ""; return raw
+        self._qstr = raw[q + 1:]; return raw[:q]
+
+    # --- POST routes ---
+    def _post_send(self, path):
+        body = self._read_json()
+        to = (body.get("to") or "").strip()
+        conv = body.get("conv")
+        text = (body.get("text") or "").strip()
+        # default to settings if missing
+        cfg = settings_cache
+        ch_default = as_int(cfg.get("default_channel_index", 0), 0)
+        ack_default = as_bool(cfg.get("want_ack_default", True), True)
+        ch = as_int(body.get("channelIndex", ch_default), ch_default)
+        wantAck = as_bool(body.get("wantAck", ack_default), ack_default)
+
+        if not text:
+            self._send_json({"error":"empty text"}, 400); return
+        if not _connected or g_iface is None:
+            self._send_json({"error":"not connected"}, 503); return
+
+        peer_forced = None
+        if conv and conv.startswith("pair:") and my_id:
+            pr = parse_pair_conv(conv)
+            if pr and (my_id in pr):
+                a,b = pr; peer_forced = b if my_id==a else a
+        if peer_forced: to = peer_forced
+
+        if (not to) and (conv != "^all"):
+            self._send_json({"error":"no destination"}, 400); return
+
         try:
-            path = urlparse(self.path).path
-            if path == "/api/send":
-                body = self._read_json()
-                to = (body.get("to") or "").strip()
-                conv = body.get("conv")
-                text = (body.get("text") or "").strip()
-                # default to settings if missing
-                with settings_lock:
-                    ch_default = as_int(settings.get("default_channel_index", 0), 0)
-                    ack_default = as_bool(settings.get("want_ack_default", True), True)
-                ch = as_int(body.get("channelIndex", ch_default), ch_default)
-                wantAck = as_bool(body.get("wantAck", ack_default), ack_default)
-
-                if not text:
-                    self._hdr_json(400); self.wfile.write(json.dumps({"error":"empty text"}).encode("utf-8")); return
-                if not _connected or g_iface is None:
-                    self._hdr_json(503); self.wfile.write(json.dumps({"error":"not connected"}).encode("utf-8")); return
-
-                peer_forced = None
-                if conv and conv.startswith("pair:") and my_id:
-                    pr = parse_pair_conv(conv)
-                    if pr and (my_id in pr):
-                        a,b = pr; peer_forced = b if my_id==a else a
-                if peer_forced: to = peer_forced
-
-                if (not to) and (conv != "^all"):
-                    self._hdr_json(400); self.wfile.write(json.dumps({"error":"no destination"}).encode("utf-8")); return
+            # epoch/iso are filled in by _sent_writer when the message is stored
+            if conv == "^all" or to == "^all":
+                g_iface.sendText(text, destinationId="^all", channelIndex=ch, wantAck=wantAck)
+                _record_recent_send("^all", text, time.monotonic())
+                msg = {"epoch": None,"iso": None,
+                       "fromId": my_id, "toId": "^all", "text": text, "scope": "broadcast"}
+                _queue_sent_msg("^all", msg)
+                self._send_json({"ok": True, "conv": "^all"}); return
+            else:
+                g_iface.sendText(text, destinationId=to, channelIndex=ch, wantAck=wantAck)
+                _record_recent_send(to, text, time.monotonic())
+                conv_id = conv if conv else (pair_conv_id(my_id, to) if my_id else f"pair:{to}|{to}")
+                msg = {"epoch": None,"iso": None,
+                       "fromId": my_id or "me", "toId": to, "text": text, "scope": "dm"}
+                _queue_sent_msg(conv_id, msg)
+                self._send_json({"ok": True, "conv": conv_id}); return
+        except Exception as e:
+            self._send_json({"error": str(e)}, 500); return
+
+    def _post_settings(self, path):
+        body = self._read_json()
+        with settings_lock:
+            for key in DEFAULT_SETTINGS.keys():
+                if key in body:
+                    if key in ("log_to_csv","show_unknown","show_per_packet","want_ack_default"):
+                        settings[key] = as_bool(body[key], DEFAULT_SETTINGS[key])
+                    elif key in ("default_channel_index","history_maxlen"):
+                        settings[key] = as_int(body[key], DEFAULT_SETTINGS[key])
+                    elif key in ("history_sample_secs",):
+                        settings[key] = as_float(body[key], DEFAULT_SETTINGS[key])
+                    elif key in ("unit_temp",):
+                        uv = str(body[key]).upper()
+                        settings[key] = "C" if uv=="C" else "F"
+            _apply_settings_locked()
+            _save_settings()
+        self._send_json({"ok": True, "settings": settings})
 
-                try:
-                    ts = time.time()
-                    if conv == "^all" or to == "^all":
-                        g_iface.sendText(text, destinationId="^all", channelIndex=ch, wantAck=wantAck)
-                        _record_recent_send("^all", text, ts)
-                        msg = {"epoch": ts,"iso": datetime.now().isoformat(timespec="seconds"),
-                               "fromId": my_id, "toId": "^all", "text": text, "scope": "broadcast"}
-                        _append_msg("^all", msg)
-                        self._hdr_json(200); self.wfile.write(json.dumps({"ok": True, "conv": "^all"}).encode("utf-8")); return
-                    else:
-                        g_iface.sendText(text, destinationId=to, channelIndex=ch, wantAck=wantAck)
-                        _record_recent_send(to, text, ts)
-                        conv_id = conv if conv else (pair_conv_id(my_id, to) if my_id else f"pair:{to}|{to}")
-                        msg = {"epoch": ts,"iso": datetime.now().isoformat(timespec="seconds"),
-                               "fromId": my_id or "me", "toId": to, "text": text, "scope": "dm"}
-                        _append_msg(conv_id, msg)
-                        self._hdr_json(200); self.wfile.write(json.dumps({"ok": True, "conv": conv_id}).encode("utf-8")); return
-                except Exception as e:
-                    self._hdr_json(500); self.wfile.write(json.dumps({"error": str(e)}).encode("utf-8")); return
-
-            if path == "/api/settings":
-                body = self._read_json()
-                with settings_lock:
-                    for key in DEFAULT_SETTINGS.keys():
-                        if key in body:
-                            if key in ("log_to_csv","show_unknown","show_per_packet","want_ack_default"):
-                                settings[key] = as_bool(body[key], DEFAULT_SETTINGS[key])
-                            elif key in ("default_channel_index","history_maxlen"):
-                                settings[key] = as_int(body[key], DEFAULT_SETTINGS[key])
-                            elif key in ("history_sample_secs",):
-                                settings[key] = as_float(body[key], DEFAULT_SETTINGS[key])
-                            elif key in ("unit_temp",):
-                                uv = str(body[key]).upper()
-                                settings[key] = "C" if uv=="C" else "F"
-                    _apply_settings_locked()
-                    _save_settings()
-                self._hdr_json(200); self.wfile.write(json.dumps({"ok": True, "settings": settings}).encode("utf-8")); return
-
-            self._hdr_json(404); self.wfile.write(json.dumps({"error":"not found"}).encode("utf-8"))
+    def do_POST(self):
+        try:
+            fn = self._POST_ROUTES.get(self._split_path())
+            if fn is not None: fn(self, self.path); return
+            self.close_connection = True   # the body was never read, so the stream can't be reused
+            self._send_json({"error":"not found"}, 404)
         except Exception as e:
-            try: self._hdr_json(500); self.wfile.write(json.dumps({"error":str(e)}).encode("utf-8"))
+            self.close_connection = True
+            try: self._send_json({"error":str(e)}, 500)
             except Exception: pass
 
+    # --- GET routes ---
+    def _get_settings_json(self, path):
+        etag = f'W/"n{_data_ver["nodes"]}"'
+        if self._not_modified(etag): return
+        self._send_cached("settings", etag, lambda: _json_bytes(settings_cache))
+
+    def _get_health(self, path):
+        self._send_json({"status":"ok","connected":_connected,"node_count":len(nodes),"dropped_packets":_dropped_pkts,"time":_now_strings(time.time())[0]})
+
+    @staticmethod
+    def _names_ver(qs: dict) -> int | None:
+        # the client's names_ver, kept only while it is still current (the response may then omit names)
+        nv = as_int(qs.get("nv", ["-1"])[0], -1)
+        return nv if nv == _static_json_ver else None
+
+    def _get_nodes(self, path):
+        nv = self._names_ver(self._query())
+        lean = "" if nv is None else "l"
+        etag = f'W/"n{_data_ver["nodes"]}{lean}"'
+        if self._not_modified(etag): return
+        self._send_cached(f"nodes{lean}", etag, lambda: _nodes_json_bytes(nv))
+
+    def _get_node(self, path):
+        node_id = path.split("/",3)[-1]
+        etag = f'W/"n{_data_ver["nodes"]}"'
+        if self._not_modified(etag): return
+        node = nodes.get(node_id)   # a single published record: no lock or full snapshot needed
+        if node is None:
+            self._send_json({"error":"not found"}, 404); return
+        self._send_bytes(_json_bytes(_node_json(node)), etag)
+
+    @staticmethod
+    def _hist_n(qs: dict) -> int | None:
+        try:   # rings never hold more than HISTORY_MAXLEN rows; a larger n would only add cache keys
+            if "n" in qs: return max(1, min(1000, HISTORY_MAXLEN, int(qs["n"][0])))
+        except Exception: pass
+        return None
+
+    def _get_dashboard(self, path):
+        qs = self._query()
+        n, nv = self._hist_n(qs), self._names_ver(qs)
+        lean = "" if nv is None else "l"
+        # ?hsince=<epoch>: history rows after it only (a delta for the client to append). Each tab's value
+        # is its own last row time, so only the small delta is built per request: the nodes part comes from
+        # the same cache entry /api/nodes uses, and the full load is cached whole
+        hsince = as_float(qs["hsince"][0], None) if "hsince" in qs else None
+        nodes_ver = _data_ver["nodes"]
+        etag = f'W/"d{nodes_ver}.{_data_ver["history"]}.{n}{lean}.{hsince}"'
+        if self._not_modified(etag): return
+        if hsince is None:
+            self._send_cached(f"dash{n}{lean}", etag, lambda: _dashboard_json_bytes(n, nv)); return
+        nodes_body = _cached_json(f"nodes{lean}", f'W/"n{nodes_ver}{lean}"', lambda: _nodes_json_bytes(nv))
+        self._send_bytes(_dashboard_json_bytes(n, nv, hsince, nodes_body), etag)
+
+    def _get_history(self, path):
+        qs = self._query()
+        n = self._hist_n(qs)
+        cols = qs.get("cols", ["0"])[0] in ("1","true","True")
+        etag = f'W/"h{_data_ver["history"]}"'
+        if self._not_modified(etag): return
+        snap = _history_cols_snapshot if cols else _history_json_snapshot
+        self._send_cached(f"hist{n}.{cols}", etag, lambda: _json_bytes(snap(n)))
+
+    def _get_conversations(self, path):
+        # the recency cutoff moves with the clock, so the tag also rolls every 10 minutes
+        etag = f'W/"c{_data_ver["nodes"]}.{_data_ver["messages"]}.{int(time.time() // 600)}"'
+        if self._not_modified(etag): return
+        self._send_cached("convs", etag, lambda: _json_bytes(_conversations_snapshot()))
+
+    def _get_messages(self, path):
+        qs = self._query()
+        conv = qs.get("conv", ["^all"])[0]
+        since = None
+        if "since" in qs:
+            try: since = float(qs["since"][0])
+            except Exception: since = None
+        n = None
+        if "n" in qs:
+            try: n = max(1, min(5000, int(qs["n"][0])))
+            except Exception: n = None
+        include_b = qs.get("include_broadcast", ["0"])[0] in ("1","true","True")
+        wait = min(MSG_LONGPOLL_MAX, max(0.0, as_float(qs.get("wait", ["0"])[0], 0.0)))
+        ver = _data_ver["messages"]   # read before the snapshot: the tag can only be older than the body
+        msgs = _messages_snapshot(conv, n, since, include_b)
+        if not msgs and since is not None and wait:
+            # long-poll: hold the request until some conversation gains a message, then look once more
+            with _ver_cond: _ver_cond.wait_for(lambda: _data_ver["messages"] != ver, wait)
+            ver = _data_ver["messages"]
+            msgs = _messages_snapshot(conv, n, since, include_b)
+        vary = "Accept-Encoding, Accept"   # the body format follows Accept, so shared caches must key on it too
+        if msgpack is not None and "application/msgpack" in (self.headers.get("Accept") or ""):
+            # binary clients: smaller and faster to encode than JSON; its own tag so caches never mix the two
+            etag = f'W/"m{ver}p"'
+            if self._not_modified(etag, vary=vary): return
+            self._send_bytes(msgpack.packb(msgs, use_bin_type=True), etag, ctype="application/msgpack", vary=vary); return
+        etag = f'W/"m{ver}"'
+        if self._not_modified(etag, vary=vary): return
+        self._send_bytes(_json_bytes(msgs), etag, vary=vary)
+
     def do_GET(self):
         try:
-            path = urlparse(self.path).path
-            if path == "/":
-                self.send_response(200)
-                self.send_header("Content-Type","text/html; charset=utf-8")
-                self.send_header("Cache-Control","no-store")
-                self.end_headers()
-                self.wfile.write(DASHBOARD_PRETTY.encode("utf-8")); return
-            if path == "/simple":
-                self.send_response(200)
-                self.send_header("Content-Type","text/html; charset=utf-8")
-                self.send_header("Cache-Control","no-store")
-                self.end_headers()
-                self.wfile.write(DASHBOARD_SIMPLE.encode("utf-8")); return
-            if path == "/api/settings":
-                self.send_response(200)
-                self.send_header("Content-Type","text/html; charset=utf-8")
-                self.send_header("Cache-Control","no-store")
-                self.end_headers()
-                self.wfile.write(SETTINGS_HTML.encode("utf-8")); return
-            if path == "/api/settings/get":
-                self._hdr_json(); 
-                with settings_lock:
-                    self.wfile.write(json.dumps(settings).encode("utf-8")); 
-                return
-            if path == "/api/health":
-                self._hdr_json()
-                body = {"status":"ok","connected":_connected,"node_count":len(nodes),"time":datetime.now().isoformat(timespec="seconds")}
-                self.wfile.write(json.dumps(body).encode("utf-8")); return
-            if path == "/api/nodes":
-                self._hdr_json(); self.wfile.write(json.dumps(_nodes_json_snapshot()).encode("utf-8")); return
-            if path.startswith("/api/nodes/"):
-                node_id = path.split("/",3)[-1]
-                snap = _nodes_json_snapshot()
-                node = snap["nodes"].get(node_id)
-                if node is None:
-                    self._hdr_json(404); self.wfile.write(json.dumps({"error":"not found"}).encode("utf-8")); return
-                self._hdr_json(); self.wfile.write(json.dumps(node).encode("utf-8")); return
-            if path == "/api/history":
-                qs = parse_qs(urlparse(self.path).query)
-                n = None
-                try:
-                    if "n" in qs: n = max(1, min(1000, int(qs["n"][0])))
-                except Exception: n = None
-                self._hdr_json(); self.wfile.write(json.dumps(_history_json_snapshot(n)).encode("utf-8")); return
-            if path == "/api/conversations":
-                self._hdr_json(); self.wfile.write(json.dumps(_conversations_snapshot()).encode("utf-8")); return
-            if path == "/api/messages":
-                qs = parse_qs(urlparse(self.path).query)
-                conv = qs.get("conv", ["^all"])[0]
-                since = None
-                if "since" in qs:
-                    try: since = float(qs["since"][0])
-                    except Exception: since = None
-                n = None
-                if "n" in qs:
-                    try: n = max(1, min(5000, int(qs["n"][0])))
-                    except Exception: n = None
-                include_b = qs.get("include_broadcast", ["0"])[0] in ("1","true","True")
-                self._hdr_json(); self.wfile.write(json.dumps(_messages_snapshot(conv, n, since, include_b)).encode("utf-8")); return
-
-            self._hdr_json(404); self.wfile.write(json.dumps({"error":"not found"}).encode("utf-8"))
+            # one dict lookup per request instead of a chain of path compares; /api/nodes/<id> is the only prefix route
+            path = self._split_path()
+            fn = self._GET_ROUTES.get(path)
+            if fn is None and path.startswith("/api/nodes/"): fn = ApiHandler._get_node
+            if fn is not None: fn(self, path); return
+            self._send_json({"error":"not found"}, 404)
         except Exception as e:
-            try: self._hdr_json(500); self.wfile.write(json.dumps({"error":str(e)}).encode("utf-8"))
+            self.close_connection = True   # a half-written response may already be on the wire
+            try: self._send_json({"error":str(e)}, 500)
             except Exception: pass
 
+    _POST_ROUTES = {"/api/send": _post_send, "/api/settings": _post_settings}
+    _GET_ROUTES = {
+        "/": lambda self, path: self._send_html(DASHBOARD_PRETTY),
+        "/simple": lambda self, path: self._send_html(DASHBOARD_SIMPLE),
+        "/api/settings": lambda self, path: self._send_html(SETTINGS_HTML),
+        "/api/settings/get": _get_settings_json,
+        "/api/stream": lambda self, path: self._stream_events(),
+        "/api/health": _get_health,
+        "/api/nodes": _get_nodes,
+        "/api/history": _get_history,
+        "/api/dashboard": _get_dashboard,
+        "/api/conversations": _get_conversations,
+        "/api/messages": _get_messages,
+    }
+
     def log_message(self, fmt, *args): pass
 
+class ApiServer(HTTPServer):
+    # connections go to a pool of at most API_MAX_THREADS daemon workers, started on demand and then
+    # reused, so a reconnecting poller costs a queue put instead of a thread start. Past the cap the
+    # accept loop waits for a slot and new connections queue in the listen backlog
+    daemon_threads = True
+    def __init__(self, *a, **kw):
+        super().__init__(*a, **kw)
+        self._slots = threading.BoundedSemaphore(API_MAX_THREADS)
+        self._work: "queue.SimpleQueue[tuple]" = queue.SimpleQueue()
+        self._idle = 0; self._idle_lock = threading.Lock()
+    def process_request(self, request, client_address):
+        self._slots.acquire()
+        with self._idle_lock:
+            spawn = self._idle == 0
+            if not spawn: self._idle -= 1
+        try:
+            if spawn: threading.Thread(target=self._worker, name="api", daemon=True).start()
+        except Exception:
+            self._slots.release(); raise
+        self._work.put((request, client_address))
+    def _worker(self):
+        get = self._work.get
+        while True:
+            request, client_address = get()
+            try: self.process_request_thread(request, client_address)   # handles errors and closes the socket
+            finally:
+                # count as idle before freeing the slot, so the next accept reuses this worker
+                with self._idle_lock: self._idle += 1
+                self._slots.release()
+
 def start_api_server():
-    httpd = HTTPServer((API_HOST, API_PORT), ApiHandler)
+    httpd = ApiServer((API_HOST, API_PORT), ApiHandler)
     t = threading.Thread(target=httpd.serve_forever, daemon=True); t.start()
     say(f"[API] Live on http://{API_HOST}:{API_PORT} (pretty=/ , simple=/simple , settings=/api/settings)")
 
 # --- main loop ---
 def main():
     _load_settings()  # load and apply persistent settings
+    _history_load()
+    threading.Thread(target=_packet_worker, name="packets", daemon=True).start()
+    threading.Thread(target=_sent_writer, name="sent-msgs", daemon=True).start()
     pub.subscribe(on_receive,"meshtastic.receive")
     pub.subscribe(on_connection,"meshtastic.connection.established")
     pub.subscribe(on_connection_lost,"meshtastic.connection.lost")
     pub.subscribe(on_node_updated,"meshtastic.node.updated")
     start_api_server()
-    iface=None; backoff=1.0; last_table=0.0
+    # deadlines run on the monotonic clock, so a wall-clock step can't stall or flood the table
+    iface=None; backoff=1.0; clock=time.monotonic; last_table=float("-inf"); last_hist_flush=clock()
     say(f"Opening TCP {HOST}:4403 …")
     try:
         while True:
@@ -1247,15 +2384,19 @@ def main():
                 except Exception as e:
                     say(f"[Connect] failed: {e}. Retrying in {int(backoff)}s…")
                     time.sleep(backoff); backoff=min(30.0, backoff*2.0)
-            try:
-                typ,payload=outq.get(timeout=0.5)
-                if typ=="msg": print(payload, flush=True)
-                elif typ=="packet": handle_packet(payload)
-            except queue.Empty:
-                pass
-            now=time.time()
+            # callbacks set the event; otherwise sleep right up to the next table/flush deadline
+            due = last_table + REFRESH_EVERY
+            if HISTORY_DIR: due = min(due, last_hist_flush + HISTORY_FLUSH_SECS)
+            _outq_wake.wait(timeout=max(0.0, due - clock())); _outq_wake.clear()
+            if outq:   # one write + flush per batch instead of one per line
+                pop = outq.popleft
+                print("\n".join([pop() for _ in range(min(len(outq), OUTQ_BATCH))]), flush=True)
+            if outq: _outq_wake.set()   # more than one batch queued: come straight back after the deadlines
+            now=clock()
             if now-last_table>=REFRESH_EVERY:
                 print("\n"+render_table(), flush=True); last_table=now
+            if HISTORY_DIR and now-last_hist_flush>=HISTORY_FLUSH_SECS:
+                _history_flush(); last_hist_flush=now
     except KeyboardInterrupt:
         pass
     finally: